@@ -3,6 +3,6 @@ Meeting Rescheduler package.
 """
 
 from .app import demo as interface
-from .calendar_tool import CalendarTool
+from .calendar_service import CalendarService
 
-__all__ = ['interface', 'CalendarTool']
+__all__ = ['interface', 'CalendarService']
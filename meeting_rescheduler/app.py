@@ -1,149 +1,223 @@
 import os
+import asyncio
 import gradio as gr
 from dotenv import load_dotenv
-from openai import OpenAI
-from typing import List, Tuple, Dict, Any
+from openai import AsyncOpenAI
+from typing import List, Tuple, Dict, Any, AsyncIterator
 from datetime import datetime, timedelta
 import re
-import json
-from .calendar_tool import CalendarTool
+import time
+from collections import OrderedDict
+from functools import lru_cache
+try:
+    import orjson as json_decoder
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    import json as json_decoder
+from .calendar_service import CalendarService
+from . import intent
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client with error handling
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+# Small, fast model for structured extraction; larger model for free-form chat
+ROUTER_MODEL = os.getenv("ROUTER_MODEL", "gpt-4o-mini")
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o")
+
+# Minimum seconds between streamed chatbot updates
+STREAM_FLUSH_INTERVAL = 0.025
+
+# Number of most recent chat turns sent with each free-form message
+HISTORY_WINDOW = 6
+
+# Event IDs quoted in chat messages, e.g. "ID: abc123"
+_EVENT_ID_RE = re.compile(r'ID:?\s*(\S+)')
+
+# Display formats for event start times; the date part is rendered once per day
+EVENT_DATE_FORMAT = '%B %d, %Y'
+EVENT_CLOCK_FORMAT = '%I:%M %p'
+EVENT_TIME_FORMAT = f'{EVENT_DATE_FORMAT} at {EVENT_CLOCK_FORMAT}'
+
+# Number of rendered event listings kept by format_events_message
+FORMAT_CACHE_SIZE = 32
+_format_cache: "OrderedDict[Tuple, str]" = OrderedDict()
 
 try:
-    client = OpenAI(api_key=api_key)
-    calendar_tool = CalendarTool()
+    calendar_service = CalendarService(connect=False)
 except Exception as e:
     print(f"Error initializing services: {e}")
     raise
 
-# Global state for connection status
-is_connected = False
+@lru_cache(maxsize=1)
+def get_client() -> AsyncOpenAI:
+    """Create the OpenAI client on first use so a missing key doesn't block the UI."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+    return AsyncOpenAI(api_key=api_key)
+
+# Seconds to reuse upcoming-events results before fetching them again
+UPCOMING_EVENTS_TTL = 60
+_upcoming_events_cache: Dict[int, Tuple[float, Tuple[int, Dict[str, List[Dict[str, Any]]]]]] = {}
+
+async def get_upcoming_events(days: int = 7) -> Tuple[int, Dict[str, List[Dict[str, Any]]]]:
+    """Get the upcoming events count and details, cached for UPCOMING_EVENTS_TTL seconds."""
+    now = time.monotonic()
+    cached = _upcoming_events_cache.get(days)
+    if cached and now - cached[0] < UPCOMING_EVENTS_TTL:
+        return cached[1]
+    result = await asyncio.to_thread(calendar_service.get_upcoming_events_count, days)
+    _upcoming_events_cache[days] = (now, result)
+    return result
+
+def invalidate_upcoming_events() -> None:
+    """Drop cached upcoming events after the calendar changes."""
+    _upcoming_events_cache.clear()
+
+async def connect_calendar() -> AsyncIterator[Tuple[str, str]]:
+    """Connect to Google Calendar.
 
-def connect_calendar():
-    """Connect to Google Calendar."""
-    global is_connected
+    Yields (status, chatbot) messages as soon as authentication succeeds, then
+    again once the upcoming events have been fetched.
+    """
     try:
-        if calendar_tool.authenticate():
-            is_connected = True
+        if await asyncio.to_thread(calendar_service.authenticate):
+            invalidate_upcoming_events()
             status_msg = "✅ Successfully connected to Google Calendar!"
-            chatbot_msg = status_msg
+            yield status_msg, status_msg
             # Try to get upcoming events as a test
             try:
-                _, events = calendar_tool.get_upcoming_events_count(7)
+                _, events = await get_upcoming_events(7)
                 if events:
-                    chatbot_msg += "\n\nFound your calendar! Here are your upcoming meetings:\n\n"
+                    chatbot_msg = status_msg + "\n\nFound your calendar! Here are your upcoming meetings:\n\n"
                     chatbot_msg += format_events_message(events)
+                    yield status_msg, chatbot_msg
             except Exception as e:
                 print(f"Error getting initial events: {e}")
-            return status_msg, chatbot_msg
+            return
         error_msg = "❌ Failed to connect to Google Calendar. Please check your credentials."
-        return error_msg, error_msg
+        yield error_msg, error_msg
     except Exception as e:
         error_msg = str(e)
         if "credentials.json" in error_msg:
             error_msg = "❌ Error: credentials.json not found. Please ensure you have your Google OAuth credentials file."
         else:
             error_msg = f"❌ Error connecting to calendar: {error_msg}"
-        return error_msg, error_msg
+        yield error_msg, error_msg
 
-def get_events_for_range(start_date: str, end_date: str) -> str:
+async def get_events_for_range(start_date: str, end_date: str) -> str:
     """Get events for a specific date range."""
-    if not is_connected:
+    if not calendar_service.is_authenticated:
         return "Please connect to Google Calendar first."
     
     try:
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-        events = calendar_tool.get_events(start, end)
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date)
+        events = await asyncio.to_thread(calendar_service.get_classified_events, start, end)
         return format_events_message(events)
     except Exception as e:
         return f"Error retrieving events: {str(e)}"
 
-def cancel_event_by_id(event_id: str) -> str:
+async def cancel_event_by_id(event_id: str) -> str:
     """Cancel a specific event."""
-    if not is_connected:
+    if not calendar_service.is_authenticated:
         return "Please connect to Google Calendar first."
     
     try:
-        if calendar_tool.cancel_event(event_id.strip()):
+        if await asyncio.to_thread(calendar_service.cancel_event, event_id.strip()):
+            invalidate_upcoming_events()
             return f"✅ Successfully cancelled event {event_id}"
         return f"❌ Failed to cancel event {event_id}"
     except Exception as e:
         return f"❌ Error cancelling event: {str(e)}"
 
-def send_reschedule_email(event_id: str, message: str) -> str:
+async def send_reschedule_email(event_id: str, message: str) -> str:
     """Send a rescheduling email for a specific event."""
-    if not is_connected:
+    if not calendar_service.is_authenticated:
         return "Please connect to Google Calendar first."
     
     try:
-        event = calendar_tool.get_event_details(event_id.strip())
-        if event and calendar_tool.send_rescheduling_email(event, message):
-            return f"✅ Successfully sent rescheduling email for event {event_id}"
+        event = await asyncio.to_thread(calendar_service.get_event_details, event_id.strip())
+        if event:
+            success, _ = await asyncio.to_thread(calendar_service.send_rescheduling_email, event, message)
+            if success:
+                return f"✅ Successfully sent rescheduling email for event {event_id}"
         return f"❌ Failed to send rescheduling email for event {event_id}"
     except Exception as e:
         return f"❌ Error sending email: {str(e)}"
 
+def _render_section(header: str, events: List[Dict[str, Any]]) -> str:
+    """Render one markdown section of format_events_message."""
+    parts = [header]
+    fromisoformat = datetime.fromisoformat
+    # Events arrive sorted by start time, so most share a date label
+    day_labels: Dict[Any, str] = {}
+    for event in events:
+        start_time = event.get('start', {}).get('dateTime', 'unknown time')
+        if isinstance(start_time, str):
+            try:
+                start_dt = fromisoformat(start_time)
+            except ValueError:
+                pass
+            else:
+                day = start_dt.date()
+                day_label = day_labels.get(day)
+                if day_label is None:
+                    day_label = day_labels[day] = start_dt.strftime(EVENT_DATE_FORMAT)
+                start_time = f"{day_label} at {start_dt.strftime(EVENT_CLOCK_FORMAT)}"
+        parts.append(f"- **{event.get('summary', 'Untitled')}**\n")
+        parts.append(f"  - Time: {start_time}\n")
+        parts.append(f"  - ID: `{event['id']}`\n")
+        if event.get('attendees'):
+            parts.append(f"  - Attendees: {len(event['attendees'])}\n")
+        parts.append("\n")
+    return "".join(parts)
+
 def format_events_message(events: Dict[str, List[Dict[str, Any]]]) -> str:
-    """Format events into a readable message with markdown."""
-    message = "## Your Meetings\n\n"
+    """Format events into a readable message with markdown.
+
+    Output is memoized by the events' (id, etag) pairs, which change whenever
+    Google modifies an event, so unchanged listings are not re-rendered.
+    """
+    try:
+        key = tuple(
+            tuple((event['id'], event['etag']) for event in events[section])
+            for section in ('recurring', 'one_off')
+        )
+    except KeyError:
+        key = None  # Events without an etag are not cached
+    if key in _format_cache:
+        _format_cache.move_to_end(key)
+        return _format_cache[key]
+    
+    sections = ["## Your Meetings\n\n"]
     
     if events['recurring']:
-        message += "### 🔄 Recurring Meetings\n"
-        for event in events['recurring']:
-            start_time = event.get('start', {}).get('dateTime', 'unknown time')
-            if isinstance(start_time, str):
-                try:
-                    dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    start_time = dt.strftime('%B %d, %Y at %I:%M %p')
-                except:
-                    pass
-            message += f"- **{event.get('summary', 'Untitled')}**\n"
-            message += f"  - Time: {start_time}\n"
-            message += f"  - ID: `{event['id']}`\n"
-            if event.get('attendees'):
-                message += f"  - Attendees: {len(event['attendees'])}\n"
-            message += "\n"
+        sections.append(_render_section("### 🔄 Recurring Meetings\n", events['recurring']))
     
     if events['one_off']:
-        message += "### 📅 One-off Meetings\n"
-        for event in events['one_off']:
-            start_time = event.get('start', {}).get('dateTime', 'unknown time')
-            if isinstance(start_time, str):
-                try:
-                    dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    start_time = dt.strftime('%B %d, %Y at %I:%M %p')
-                except:
-                    pass
-            message += f"- **{event.get('summary', 'Untitled')}**\n"
-            message += f"  - Time: {start_time}\n"
-            message += f"  - ID: `{event['id']}`\n"
-            if event.get('attendees'):
-                message += f"  - Attendees: {len(event['attendees'])}\n"
-            message += "\n"
+        sections.append(_render_section("### 📅 One-off Meetings\n", events['one_off']))
     
     if not events['recurring'] and not events['one_off']:
-        message += "_No meetings found in this time period._\n"
+        sections.append("_No meetings found in this time period._\n")
     
+    message = "".join(sections)
+    if key is not None:
+        _format_cache[key] = message
+        if len(_format_cache) > FORMAT_CACHE_SIZE:
+            _format_cache.popitem(last=False)
     return message
 
-def parse_date_range(text: str) -> Tuple[datetime, datetime]:
-    """Extract date range from user input using GPT-4."""
+async def parse_date_range(text: str) -> Tuple[datetime, datetime]:
+    """Extract date range from user input using the router model."""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
+        response = await get_client().chat.completions.create(
+            model=ROUTER_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that extracts date ranges from text. Always respond with exactly two dates in YYYY-MM-DD format, separated by a newline. If no specific dates are mentioned, use the next occurrence of the time period mentioned."},
                 {"role": "user", "content": text}
             ],
-            temperature=0
+            temperature=0,
+            max_tokens=64
         )
         
         dates = response.choices[0].message.content.strip().split('\n')
@@ -155,96 +229,114 @@ def parse_date_range(text: str) -> Tuple[datetime, datetime]:
         return start, end
     except Exception as e:
         print(f"Error parsing dates: {e}")
-        # Return next week as default
-        start = datetime.now()
-        end = start + timedelta(days=7)
-        return start, end
+        return default_date_range()
+
+def default_date_range() -> Tuple[datetime, datetime]:
+    """Return next week as the default date range."""
+    start = datetime.now()
+    return start, start + timedelta(days=7)
 
-def parse_event_datetime(text: str) -> Tuple[datetime, datetime]:
-    """Extract specific event date and time from text using GPT-4."""
+def default_event_datetime() -> Tuple[datetime, datetime]:
+    """Return the next business day at 10 AM with a 1 hour duration."""
+    start = datetime.now().replace(hour=10, minute=0) + timedelta(days=1)
+    if start.weekday() > 4:  # If weekend, move to Monday
+        start += timedelta(days=(7 - start.weekday()))
+    return start, start + timedelta(hours=1)
+
+def default_event_details() -> Dict[str, Any]:
+    """Return placeholder details for an event that could not be parsed."""
+    return {
+        "summary": "New Meeting",
+        "description": "",
+        "location": "",
+        "attendees": []
+    }
+
+async def extract_intent(text: str) -> Dict[str, Any]:
+    """Extract event details and date/time range from text in a single GPT call.
+
+    Missing event details fall back to default_event_details(); a missing or
+    unparseable start/end is returned as None.
+    """
+    parsed = {}
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
+        response = await get_client().chat.completions.create(
+            model=ROUTER_MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts event date and time from text. Always respond with exactly two lines in YYYY-MM-DD HH:MM format for start and end time. If only start time is mentioned, assume 1 hour duration. If no specific time is mentioned, use 10:00 AM. If no date is mentioned, use the next business day."},
+                {"role": "system", "content": "You are a helpful assistant that extracts calendar requests from text. Return a JSON object with: intent (one of \"create_event\", \"time_off\", \"other\"), summary (string), description (string), location (string), attendees (array of email addresses), start and end (strings in YYYY-MM-DD HH:MM format). If only a start time is mentioned, assume 1 hour duration. If no specific time is mentioned, use 10:00 for events and 00:00 for time off periods. If no date is mentioned, use the next business day for events and the next occurrence of the time period mentioned for time off. If any other field is not mentioned, use empty string or empty array."},
                 {"role": "user", "content": text}
             ],
-            temperature=0
+            temperature=0,
+            max_tokens=200,
+            response_format={"type": "json_object"}
         )
-        
-        times = response.choices[0].message.content.strip().split('\n')
-        if len(times) != 2:
-            raise ValueError("Expected start and end time")
-            
-        start = datetime.strptime(times[0], '%Y-%m-%d %H:%M')
-        end = datetime.strptime(times[1], '%Y-%m-%d %H:%M')
-        return start, end
+        parsed = json_decoder.loads(response.choices[0].message.content)
     except Exception as e:
-        print(f"Error parsing event time: {e}")
-        # Default to next business day at 10 AM
-        start = datetime.now().replace(hour=10, minute=0) + timedelta(days=1)
-        if start.weekday() > 4:  # If weekend, move to Monday
-            start += timedelta(days=(7 - start.weekday()))
-        return start, start + timedelta(hours=1)
-
-def extract_event_details(text: str) -> Dict[str, Any]:
-    """Extract event details from text using GPT-4."""
+        print(f"Error extracting intent: {e}")
+
+    details = default_event_details()
+    for key in details:
+        if parsed.get(key):
+            details[key] = parsed[key]
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts event details from text. Return a JSON object with: summary (string), description (string), location (string), and attendees (array of email addresses). If any field is not mentioned, use empty string or empty array."},
-                {"role": "user", "content": text}
-            ],
-            temperature=0
-        )
-        
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        print(f"Error extracting event details: {e}")
-        return {
-            "summary": "New Meeting",
-            "description": "",
-            "location": "",
-            "attendees": []
-        }
-
-def chat_with_gpt(message: str, history: List[List[str]]) -> Tuple[str, List[List[str]]]:
-    """Process user input and generate response using GPT-4."""
+        start = datetime.strptime(parsed["start"], '%Y-%m-%d %H:%M')
+        end = datetime.strptime(parsed["end"], '%Y-%m-%d %H:%M')
+    except (KeyError, TypeError, ValueError):
+        start = end = None
+
+    return {
+        "intent": parsed.get("intent", "other"),
+        **details,
+        "start": start,
+        "end": end
+    }
+
+async def chat_with_gpt(message: str, history: List[List[str]]) -> AsyncIterator[Tuple[str, List[List[str]]]]:
+    """Process user input and generate response using the chat model.
+
+    Yields successive (textbox, history) updates so Gradio can render the
+    conversational reply as it streams in.
+    """
     try:
         if not message.strip():
-            return "", history
+            yield "", history
+            return
+        message_intent = intent.match_intent(message)
             
         # Check for calendar connection request
-        if "connect" in message.lower() and "calendar" in message.lower():
-            response = connect_calendar()
-            return "", history + [[message, response]]
+        if message_intent == 'connect':
+            async for _, response in connect_calendar():
+                yield "", history + [[message, response]]
+            return
             
         # Check if calendar is connected before proceeding with other operations
-        if not is_connected:
-            if any(phrase in message.lower() for phrase in [
-                "schedule", "create", "cancel", "upcoming", "meetings", "events"
-            ]):
-                return "", history + [[message, "Please connect to Google Calendar first by saying 'connect calendar'"]]
+        if not calendar_service.is_authenticated:
+            if intent.mentions_calendar(message):
+                yield "", history + [[message, "Please connect to Google Calendar first by saying 'connect calendar'"]]
+                return
         
         # Check for upcoming events query
-        if any(phrase in message.lower() for phrase in ["how many meetings", "upcoming events", "upcoming meetings", "schedule for next"]):
-            days_match = re.search(r'next\s+(\d+)\s+days?', message.lower())
-            days = int(days_match.group(1)) if days_match else 7
+        if message_intent == 'upcoming':
+            days = intent.parse_days(message) or 7
             
-            count, events = calendar_tool.get_upcoming_events_count(days)
+            count, events = await get_upcoming_events(days)
             events_message = format_events_message(events)
             response = f"You have {count} upcoming meetings in the next {days} days.\n\n{events_message}"
-            return "", history + [[message, response]]
+            yield "", history + [[message, response]]
+            return
         
         # Check for event creation request
-        if any(phrase in message.lower() for phrase in ["schedule a meeting", "create an event", "set up a meeting", "arrange a meeting"]):
-            # Extract event details and time
-            details = extract_event_details(message)
-            start_time, end_time = parse_event_datetime(message)
+        if message_intent == 'create':
+            # Parse details locally, falling back to a single LLM call
+            details = intent.parse_event_details(message) or await extract_intent(message)
+            if details["start"] and details["end"]:
+                start_time, end_time = details["start"], details["end"]
+            else:
+                start_time, end_time = default_event_datetime()
             
             # Create the event
-            event = calendar_tool.create_event(
+            event = await asyncio.to_thread(
+                calendar_service.create_event,
                 summary=details["summary"],
                 start_time=start_time,
                 end_time=end_time,
@@ -254,9 +346,10 @@ def chat_with_gpt(message: str, history: List[List[str]]) -> Tuple[str, List[Lis
             )
             
             if event:
-                response = f"✅ I've created the event:\n\n" + \
+                invalidate_upcoming_events()
+                response = "✅ I've created the event:\n\n" + \
                           f"**{event.get('summary')}**\n" + \
-                          f"📅 {start_time.strftime('%B %d, %Y at %I:%M %p')} to {end_time.strftime('%I:%M %p')}\n"
+                          f"📅 {start_time.strftime(EVENT_TIME_FORMAT)} to {end_time.strftime(EVENT_CLOCK_FORMAT)}\n"
                 if event.get('location'):
                     response += f"📍 {event['location']}\n"
                 if event.get('attendees'):
@@ -264,25 +357,37 @@ def chat_with_gpt(message: str, history: List[List[str]]) -> Tuple[str, List[Lis
                 response += f"\nEvent ID: `{event['id']}`"
             else:
                 response = "❌ Sorry, I couldn't create the event. Please try again with more specific details."
-            return "", history + [[message, response]]
+            yield "", history + [[message, response]]
+            return
         
         # Check for event cancellation request
-        if "cancel" in message.lower() and ("event" in message.lower() or "meeting" in message.lower()):
-            event_id_match = re.search(r'ID:?\s*([^\s]+)', message)
+        if message_intent == 'cancel':
+            event_id_match = _EVENT_ID_RE.search(message)
             if event_id_match:
                 event_id = event_id_match.group(1)
-                response = cancel_event_by_id(event_id)
-                return "", history + [[message, response]]
+                response = await cancel_event_by_id(event_id)
+                yield "", history + [[message, response]]
+                return
             else:
                 response = "Please provide the event ID to cancel. You can find event IDs by asking about your upcoming meetings."
-                return "", history + [[message, response]]
+                yield "", history + [[message, response]]
+                return
         
         # Check for time off or vacation related queries
-        if any(phrase in message.lower() for phrase in ["time off", "vacation", "away", "out of office"]):
-            start_date, end_date = parse_date_range(message)
-            events = calendar_tool.get_events(start_date, end_date)
+        if message_intent == 'time_off':
+            date_range = intent.parse_date_range(message)
+            if date_range:
+                start_date, end_date = date_range
+            else:
+                details = await extract_intent(message)
+                if details["start"] and details["end"]:
+                    start_date, end_date = details["start"], details["end"]
+                else:
+                    start_date, end_date = default_date_range()
+            events = await asyncio.to_thread(calendar_service.get_classified_events, start_date, end_date)
             response = format_events_message(events)
-            return "", history + [[message, response]]
+            yield "", history + [[message, response]]
+            return
             
         # Default to regular chat
         messages = [{"role": "system", "content": """You are a helpful meeting rescheduler assistant that helps users manage their calendar. You can:
@@ -292,28 +397,40 @@ def chat_with_gpt(message: str, history: List[List[str]]) -> Tuple[str, List[Lis
 4. Handle time off periods (e.g., 'I'll be on vacation next week')
 If users don't provide enough details, ask for clarification."""}]
         
-        # Convert history to OpenAI message format
-        for human, assistant in history:
-            if human:
-                messages.append({"role": "user", "content": human})
-            if assistant:
-                messages.append({"role": "assistant", "content": assistant})
+        # Convert the most recent turns to OpenAI message format, skipping empty ones
+        messages.extend(
+            {"role": role, "content": content}
+            for human, assistant in history[-HISTORY_WINDOW:]
+            for role, content in (("user", human), ("assistant", assistant))
+            if content
+        )
         
         messages.append({"role": "user", "content": message})
         
-        response = client.chat.completions.create(
-            model="gpt-4",
+        stream = await get_client().chat.completions.create(
+            model=CHAT_MODEL,
             messages=messages,
             temperature=0.7,
-            max_tokens=500
+            max_tokens=500,
+            stream=True
         )
         
-        bot_message = response.choices[0].message.content
-        return "", history + [[message, bot_message]]
+        bot_message = ""
+        last_flush = time.monotonic()
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            bot_message += chunk.choices[0].delta.content
+            # Coalesce tokens so the chatbot isn't re-rendered for every chunk
+            now = time.monotonic()
+            if now - last_flush >= STREAM_FLUSH_INTERVAL:
+                last_flush = now
+                yield "", history + [[message, bot_message]]
+        yield "", history + [[message, bot_message]]
     except Exception as e:
         error_message = f"❌ I apologize, but I encountered an error: {str(e)}"
         print(f"Error in chat_with_gpt: {e}")
-        return "", history + [[message, error_message]]
+        yield "", history + [[message, error_message]]
 
 # Create the Gradio interface with the enhanced configuration
 with gr.Blocks(theme=gr.themes.Soft()) as demo:
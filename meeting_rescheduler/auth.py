@@ -1,7 +1,7 @@
 import os
-import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import threading
+from functools import lru_cache
+from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 
 # If modifying these scopes, delete the file token.json.
@@ -16,26 +16,87 @@ SCOPES = [
 CREDENTIALS_FILE = 'credentials.json'
 TOKEN_FILE = 'token.json'
 
+# Seconds before a Google API request over the shared connection times out
+HTTP_TIMEOUT = 30
+
+# Credentials from the last authenticate() call, reused while still valid
+_CREDS = None
+
 def authenticate():
-    creds = None
+    global _CREDS
+    if _CREDS and _CREDS.valid:
+        return _CREDS
+    creds = _CREDS
     # Load existing token if available
-    if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, 'rb') as token:
-            creds = pickle.load(token)
+    if not creds and os.path.exists(TOKEN_FILE):
+        try:
+            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        except ValueError:
+            creds = None  # Legacy pickled or corrupt token; re-run the OAuth flow
     # If no valid credentials, start OAuth2 flow
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
+            from google_auth_oauthlib.flow import InstalledAppFlow  # Only needed for first-time login
             flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
-        with open(TOKEN_FILE, 'wb') as token:
-            pickle.dump(creds, token)
+        with open(TOKEN_FILE, 'w') as token:
+            token.write(creds.to_json())
+    _CREDS = creds
     return creds
 
+class _ThreadLocalHttp:
+    """An authorized HTTP connection per thread, behind a single http object.
+
+    httplib2.Http is not thread-safe, but the API clients built from it are
+    shared by the event loop thread and the executor threads. Each thread gets
+    its own keep-alive connection the first time it makes a request.
+    """
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self._local = threading.local()
+
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        return http
+
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Anything else (timeout, close, ...) is the calling thread's connection's
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._http(), name)
+
+@lru_cache(maxsize=4)
+def authorized_http(credentials):
+    """Get the authorized HTTP object for a set of credentials.
+
+    Every API client built for the same credentials shares it; each thread
+    reuses its own keep-alive TLS session. Expired tokens are refreshed
+    before a request or on a 401.
+    """
+    return _ThreadLocalHttp(credentials)
+
+@lru_cache(maxsize=8)
+def build_service(api, version, credentials):
+    """Build a Google API client, reusing it for the same credentials.
+
+    Discovery documents are loaded from the copies bundled with
+    google-api-python-client instead of being fetched over the network.
+    """
+    from googleapiclient.discovery import build
+    return build(api, version, http=authorized_http(credentials), static_discovery=True, cache_discovery=False)
+
 def print_authenticated_user(creds):
-    service = build('oauth2', 'v2', credentials=creds)
+    service = build_service('oauth2', 'v2', creds)
     user_info = service.userinfo().get().execute()
     print(f"Successfully authenticated as: {user_info['email']}")
 
@@ -1,62 +1,248 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Tuple
-from googleapiclient.discovery import build
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Callable, Iterator, List, Dict, Optional, Tuple
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, MediaIoBaseUpload
 from email.mime.text import MIMEText
 import base64
-from .auth import authenticate
+import io
+import string
+from .auth import authenticate, build_service
+
+# Partial responses: only the Event fields this package reads
+EVENT_FIELDS = 'id,etag,summary,start,end,attendees(email),recurrence,recurringEventId,organizer/email'
+EVENT_LIST_FIELDS = f'items({EVENT_FIELDS},status),nextPageToken'
+EVENT_DETAIL_FIELDS = f'{EVENT_FIELDS},status'
+SERIES_FIELDS = 'recurrence'
+INSTANCE_ID_FIELDS = 'items(id),nextPageToken'
+
+# Default body for rescheduling emails, parsed once at import
+_RESCHEDULING_TEMPLATE = string.Template("""
+Subject: Rescheduling Request: $summary
+
+Dear $organizer,
+
+I hope this email finds you well. I need to reschedule our meeting that is currently scheduled for $when_pretty due to $reason.
+
+Meeting Details:
+- Title: $summary
+- Current Time: $when
+- Attendees: $attendees
+
+Would it be possible to reschedule this meeting? Please let me know what times work best for you.
+
+Thank you for your understanding.
+
+Best regards,
+$sender
+""")
+
+@lru_cache(maxsize=1024)
+def _parse_google_dt(value: str) -> datetime:
+    """Parse a Google Calendar dateTime or all-day date string."""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+def _event_times(event: Dict) -> Tuple[datetime, datetime]:
+    """Get an event's start and end datetimes, parsing each distinct timestamp once."""
+    return (
+        _parse_google_dt(event['start'].get('dateTime', event['start'].get('date'))),
+        _parse_google_dt(event['end'].get('dateTime', event['end'].get('date')))
+    )
 
 class CalendarService:
-    def __init__(self):
+    # Google's batch endpoint accepts at most 50 calls per request
+    BATCH_SIZE = 50
+    # Batches one async cancellation may have in flight on the shared executor
+    MAX_CONCURRENT_BATCHES = 4
+    # Largest page events.list will return
+    PAGE_SIZE = 2500
+    # Emails larger than this are uploaded as raw RFC 822 bytes rather than base64 JSON
+    MEDIA_UPLOAD_THRESHOLD = 1024
+
+    def __init__(self, connect: bool = True):
+        """
+        Create the service, authenticating immediately unless connect is False.
+        With connect=False, call authenticate() before using the service.
+        """
+        self.credentials = None
+        self.service = None
+        self.gmail_service = None
+        self.user_info_service = None
+        self._user_email: Optional[str] = None
+        # googleapiclient is blocking; the async wrappers below run it here
+        self._executor = ThreadPoolExecutor(max_workers=8)
+        if connect:
+            self.authenticate()
+
+    def authenticate(self) -> bool:
+        """
+        Authenticate with Google and build the Calendar, Gmail and user info clients.
+        Returns True on success.
+        """
         self.credentials = authenticate()
-        self.service = build('calendar', 'v3', credentials=self.credentials)
-        self.gmail_service = build('gmail', 'v1', credentials=self.credentials)
-
-    def get_events(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        try:
+            self.service = build_service('calendar', 'v3', self.credentials)
+            self.gmail_service = build_service('gmail', 'v1', self.credentials)
+            self.user_info_service = build_service('oauth2', 'v2', self.credentials)
+            return True
+        except Exception as e:
+            print(f"Error building services: {e}")
+            return False
+
+    @property
+    def is_authenticated(self) -> bool:
         """
-        Retrieve all events between start_date and end_date.
-        Returns a list of event dictionaries.
+        Whether authenticate() has succeeded and the credentials are still usable.
+        Never touches the network: expired credentials with a refresh token count
+        as usable, and the authorized HTTP client refreshes them before its next
+        request, on whichever thread makes it.
         """
-        events_result = self.service.events().list(
+        if not self.credentials or not self.service:
+            return False
+        return bool(self.credentials.valid or (self.credentials.expired and self.credentials.refresh_token))
+
+    def _require_service(self) -> None:
+        if not self.service:
+            raise ValueError("Calendar service not initialized. Call authenticate() first.")
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking call on the executor without stalling the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def _list_events_request(self, start_date: datetime, end_date: datetime,
+                             page_size: int, page_token: Optional[str] = None):
+        return self.service.events().list(
             calendarId='primary',
             timeMin=start_date.isoformat() + 'Z',
             timeMax=end_date.isoformat() + 'Z',
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+            orderBy='startTime',
+            maxResults=page_size,
+            pageToken=page_token,
+            fields=EVENT_LIST_FIELDS
+        )
+
+    def iter_events(self, start_date: datetime, end_date: datetime, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Yield all events between start_date and end_date, following every result page.
+        """
+        page_token = None
+        while True:
+            events_result = self._list_events_request(start_date, end_date, page_size, page_token).execute()
+            yield from events_result.get('items', [])
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                return
+
+    async def aiter_events(self, start_date: datetime, end_date: datetime, page_size: int = PAGE_SIZE) -> AsyncIterator[Dict]:
+        """
+        Async version of iter_events.
+        The next page is fetched while the caller consumes the current one.
+        """
+        pending = asyncio.ensure_future(
+            self._run(self._list_events_request(start_date, end_date, page_size).execute)
+        )
+        try:
+            while pending is not None:
+                events_result = await pending
+                page_token = events_result.get('nextPageToken')
+                pending = asyncio.ensure_future(
+                    self._run(self._list_events_request(start_date, end_date, page_size, page_token).execute)
+                ) if page_token else None
+                for event in events_result.get('items', []):
+                    yield event
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def get_events(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """
+        Retrieve all events between start_date and end_date.
+        Returns a list of event dictionaries.
+        """
+        return list(self.iter_events(start_date, end_date))
+
+    async def aget_events(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Async version of get_events."""
+        return [event async for event in self.aiter_events(start_date, end_date)]
+
+    def get_classified_events(self, start_date: datetime, end_date: datetime) -> Dict[str, List[Dict]]:
+        """
+        Retrieve all events between start_date and end_date, classified as recurring or one-off.
+        Instances of recurring series are given their series' recurrence rules.
+        """
+        self._require_service()
+        events = self.get_events(start_date, end_date)
         
-        return events_result.get('items', [])
+        # singleEvents=True expands recurring series into instances that only carry
+        # recurringEventId, so fetch the parent series in one batch for their recurrence
+        series_ids = list(dict.fromkeys(
+            event['recurringEventId'] for event in events if 'recurringEventId' in event
+        ))
+        if series_ids:
+            series = self._execute_batch([
+                self.service.events().get(calendarId='primary', eventId=series_id, fields=SERIES_FIELDS)
+                for series_id in series_ids
+            ])
+            recurrence = {
+                series_id: parent['recurrence']
+                for series_id, parent in zip(series_ids, series)
+                if parent and 'recurrence' in parent
+            }
+            for event in events:
+                if event.get('recurringEventId') in recurrence:
+                    event['recurrence'] = recurrence[event['recurringEventId']]
+        
+        return self.classify_events(events)
+
+    async def aget_classified_events(self, start_date: datetime, end_date: datetime) -> Dict[str, List[Dict]]:
+        """Async version of get_classified_events."""
+        return await self._run(self.get_classified_events, start_date, end_date)
 
-    def classify_events(self, events: List[Dict]) -> Dict[str, List[Dict]]:
+    def _execute_batch(self, requests: List[Any]) -> List[Optional[Dict]]:
+        """
+        Execute API requests through the batch endpoint, BATCH_SIZE per round-trip.
+        Returns the responses in request order, with None for any request that failed.
+        """
+        responses: List[Optional[Dict]] = [None] * len(requests)
+        
+        def callback(request_id, response, exception):
+            if exception is not None:
+                print(f"Error in batch request {request_id}: {exception}")
+                return
+            responses[int(request_id)] = response
+        
+        for offset in range(0, len(requests), self.BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index, request in enumerate(requests[offset:offset + self.BATCH_SIZE], start=offset):
+                batch.add(request, request_id=str(index))
+            batch.execute()
+        
+        return responses
+
+    @staticmethod
+    def classify_events(events: List[Dict]) -> Dict[str, List[Dict]]:
         """
         Classify events as recurring or one-off.
         Returns a dictionary with two lists: 'recurring' and 'one_off'.
         """
-        classified_events = {
-            'recurring': [],
-            'one_off': []
+        # If the event has a recurrence rule, it's recurring
+        return {
+            'recurring': [event for event in events if 'recurrence' in event],
+            'one_off': [event for event in events if 'recurrence' not in event]
         }
-        
-        for event in events:
-            # If the event has a recurrence rule, it's recurring
-            if 'recurrence' in event:
-                classified_events['recurring'].append(event)
-            else:
-                classified_events['one_off'].append(event)
-        
-        return classified_events
 
     def format_event_info(self, event: Dict) -> str:
         """
         Format event information for display.
         Returns a formatted string with event details.
         """
-        start = event['start'].get('dateTime', event['start'].get('date'))
-        end = event['end'].get('dateTime', event['end'].get('date'))
-        
-        # Convert to datetime objects for better formatting
-        start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-        end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+        start_dt, end_dt = _event_times(event)
         
         attendees = event.get('attendees', [])
         attendee_emails = [a['email'] for a in attendees if 'email' in a]
@@ -69,42 +255,136 @@ class CalendarService:
             f"Attendees: {', '.join(attendee_emails) if attendee_emails else 'No attendees'}\n"
         )
 
-    def cancel_recurring_meetings(self, event_id: str, start_date: datetime, end_date: datetime) -> Tuple[bool, str]:
+    def _series_instances(self, event_id: str, start_date: datetime, end_date: datetime) -> Optional[List[Dict]]:
         """
-        Cancel instances of a recurring meeting within the specified date range.
-        Returns a tuple of (success, message).
+        Get the instances of a recurring event within the specified date range.
+        Returns None if the event is not recurring.
         """
-        try:
-            # Get the recurring event series
-            event = self.service.events().get(
-                calendarId='primary',
-                eventId=event_id
-            ).execute()
+        # Get the recurring event series
+        event = self.service.events().get(
+            calendarId='primary',
+            eventId=event_id,
+            fields=SERIES_FIELDS
+        ).execute()
 
-            if 'recurrence' not in event:
-                return False, "This is not a recurring event."
+        if 'recurrence' not in event:
+            return None
 
-            # Create an exception for each instance in the date range
+        # Only the ids are needed to patch the instances, following every result page
+        items = []
+        page_token = None
+        while True:
             instances = self.service.events().instances(
                 calendarId='primary',
                 eventId=event_id,
                 timeMin=start_date.isoformat() + 'Z',
-                timeMax=end_date.isoformat() + 'Z'
+                timeMax=end_date.isoformat() + 'Z',
+                pageToken=page_token,
+                fields=INSTANCE_ID_FIELDS
             ).execute()
+            items.extend(instances.get('items', []))
+            page_token = instances.get('nextPageToken')
+            if not page_token:
+                return items
 
-            for instance in instances.get('items', []):
-                # Mark the instance as cancelled
-                instance['status'] = 'cancelled'
-                self.service.events().update(
+    def _cancellation_batches(self, items: List[Dict], callback: Callable) -> List[Tuple[BatchHttpRequest, int]]:
+        """
+        Build batch requests marking the instances as cancelled, BATCH_SIZE per round-trip.
+        Returns a list of (batch, number of instances in it).
+        """
+        batches = []
+        for offset in range(0, len(items), self.BATCH_SIZE):
+            chunk = items[offset:offset + self.BATCH_SIZE]
+            batch = self.service.new_batch_http_request(callback=callback)
+            for instance in chunk:
+                batch.add(self.service.events().patch(
                     calendarId='primary',
                     eventId=instance['id'],
-                    body=instance
-                ).execute()
+                    body={'status': 'cancelled'}
+                ))
+            batches.append((batch, len(chunk)))
+        return batches
+
+    @staticmethod
+    def _cancellation_result(total: int, failures: List[Exception]) -> Tuple[bool, str]:
+        if failures:
+            return False, f"Cancelled {total - len(failures)}/{total} instances: {failures[0]}"
+        return True, f"Successfully cancelled {total} instances"
+
+    def cancel_recurring_meetings(self, event_id: str, start_date: datetime, end_date: datetime) -> Tuple[bool, str]:
+        """
+        Cancel instances of a recurring meeting within the specified date range.
+        Returns a tuple of (success, message).
+        """
+        try:
+            items = self._series_instances(event_id, start_date, end_date)
+            if items is None:
+                return False, "This is not a recurring event."
+
+            failures = []
+
+            def on_cancel_done(request_id, response, exception):
+                if exception is not None:
+                    failures.append(exception)
 
-            return True, f"Successfully cancelled {len(instances.get('items', []))} instances"
+            for batch, _ in self._cancellation_batches(items, on_cancel_done):
+                batch.execute()
 
+            return self._cancellation_result(len(items), failures)
+
+        except HttpError as error:
+            return False, f"Failed to cancel meetings: {str(error)}"
+
+    async def acancel_recurring_meetings(self, event_id: str, start_date: datetime, end_date: datetime) -> Tuple[bool, str]:
+        """
+        Async version of cancel_recurring_meetings.
+        Sends the cancellation batches concurrently, at most MAX_CONCURRENT_BATCHES at a time.
+        """
+        try:
+            items = await self._run(self._series_instances, event_id, start_date, end_date)
         except HttpError as error:
             return False, f"Failed to cancel meetings: {str(error)}"
+        if items is None:
+            return False, "This is not a recurring event."
+
+        failures = []
+
+        def on_cancel_done(request_id, response, exception):
+            if exception is not None:
+                failures.append(exception)
+
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_BATCHES)
+
+        async def send(batch: BatchHttpRequest) -> None:
+            async with semaphore:
+                # The shared http object gives each executor thread its own connection
+                await self._run(batch.execute)
+
+        batches = self._cancellation_batches(items, on_cancel_done)
+        outcomes = await asyncio.gather(*(send(batch) for batch, _ in batches), return_exceptions=True)
+        # A failed round-trip fails every instance in that batch, without aborting the others
+        for (_, size), outcome in zip(batches, outcomes):
+            if isinstance(outcome, Exception):
+                failures.extend([outcome] * size)
+
+        return self._cancellation_result(len(items), failures)
+
+    def _send_email(self, message: MIMEText) -> None:
+        """
+        Send an email through the Gmail API as the authenticated user.
+        """
+        raw_message = message.as_bytes()
+        if len(raw_message) > self.MEDIA_UPLOAD_THRESHOLD:
+            media = MediaIoBaseUpload(io.BytesIO(raw_message), mimetype='message/rfc822', resumable=False)
+            self.gmail_service.users().messages().send(
+                userId='me',
+                media_body=media
+            ).execute()
+        else:
+            self.gmail_service.users().messages().send(
+                userId='me',
+                body={'raw': base64.urlsafe_b64encode(raw_message).decode('utf-8')}
+            ).execute()
 
     def send_cancellation_notifications(self, event: Dict, start_date: datetime, end_date: datetime) -> Tuple[bool, str]:
         """
@@ -138,23 +418,25 @@ class CalendarService:
 
             # Create the email message in Gmail's required format
             message = MIMEText(body)
-            message['to'] = ', '.join(a['email'] for a in attendees if 'email' in a)
+            # Address the notice to the user and blind-copy attendees,
+            # so they don't see each other's addresses
+            message['to'] = self.get_authenticated_user_email()
+            message['bcc'] = ', '.join(a['email'] for a in attendees if 'email' in a)
             message['from'] = 'me'  # Gmail API uses 'me' to refer to the authenticated user
             message['subject'] = subject
 
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
             # Send the email
-            self.gmail_service.users().messages().send(
-                userId='me',
-                body={'raw': raw_message}
-            ).execute()
+            self._send_email(message)
 
             return True, f"Successfully sent cancellation notifications to {len(attendees)} attendees"
 
         except Exception as error:
             return False, f"Failed to send notifications: {str(error)}"
 
+    async def asend_cancellation_notifications(self, event: Dict, start_date: datetime, end_date: datetime) -> Tuple[bool, str]:
+        """Async version of send_cancellation_notifications."""
+        return await self._run(self.send_cancellation_notifications, event, start_date, end_date)
+
     def cancel_recurring_meeting_with_notifications(
         self, 
         event_id: str, 
@@ -172,7 +454,8 @@ class CalendarService:
         try:
             event = self.service.events().get(
                 calendarId='primary',
-                eventId=event_id
+                eventId=event_id,
+                fields=EVENT_FIELDS
             ).execute()
         except HttpError as error:
             return {'error': f"Failed to fetch event: {str(error)}"}
@@ -193,41 +476,27 @@ class CalendarService:
         Get all one-off meetings in the specified date range.
         Returns a list of meeting dictionaries.
         """
-        events = self.get_events(start_date, end_date)
-        classified = self.classify_events(events)
-        return classified['one_off']
+        return self.get_classified_events(start_date, end_date)['one_off']
 
     def generate_rescheduling_template(self, event: Dict, reason: str = "time off") -> str:
         """
         Generate an email template for rescheduling a one-off meeting.
         """
-        start = event['start'].get('dateTime', event['start'].get('date'))
-        start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        start_dt, _ = _event_times(event)
         
         organizer = event.get('organizer', {}).get('email', 'the organizer')
         attendees = event.get('attendees', [])
         attendee_list = ', '.join(a['email'] for a in attendees if 'email' in a)
         
-        template = f"""
-Subject: Rescheduling Request: {event['summary']}
-
-Dear {organizer},
-
-I hope this email finds you well. I need to reschedule our meeting that is currently scheduled for {start_dt.strftime('%A, %B %d at %I:%M %p')} due to {reason}.
-
-Meeting Details:
-- Title: {event['summary']}
-- Current Time: {start_dt.strftime('%Y-%m-%d %I:%M %p')}
-- Attendees: {attendee_list if attendee_list else 'No other attendees'}
-
-Would it be possible to reschedule this meeting? Please let me know what times work best for you.
-
-Thank you for your understanding.
-
-Best regards,
-{self.get_authenticated_user_email()}
-"""
-        return template
+        return _RESCHEDULING_TEMPLATE.substitute(
+            summary=event['summary'],
+            organizer=organizer,
+            when_pretty=start_dt.strftime('%A, %B %d at %I:%M %p'),
+            when=start_dt.strftime('%Y-%m-%d %I:%M %p'),
+            reason=reason,
+            attendees=attendee_list if attendee_list else 'No other attendees',
+            sender=self.get_authenticated_user_email()
+        )
 
     def send_rescheduling_email(self, event: Dict, custom_message: Optional[str] = None) -> Tuple[bool, str]:
         """
@@ -251,9 +520,7 @@ Best regards,
             
             # Remove duplicates and the sender's email
             sender_email = self.get_authenticated_user_email()
-            recipients = list(set(recipients))
-            if sender_email in recipients:
-                recipients.remove(sender_email)
+            recipients = [r for r in dict.fromkeys(recipients) if r != sender_email]
 
             if not recipients:
                 return False, "No recipients found for the email"
@@ -262,27 +529,120 @@ Best regards,
             message['from'] = 'me'
             message['subject'] = f"Rescheduling Request: {event['summary']}"
 
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
             # Send the email
-            self.gmail_service.users().messages().send(
-                userId='me',
-                body={'raw': raw_message}
-            ).execute()
+            self._send_email(message)
 
             return True, f"Successfully sent rescheduling email to {len(recipients)} recipients"
 
         except Exception as error:
             return False, f"Failed to send rescheduling email: {str(error)}"
 
+    async def asend_rescheduling_email(self, event: Dict, custom_message: Optional[str] = None) -> Tuple[bool, str]:
+        """Async version of send_rescheduling_email."""
+        return await self._run(self.send_rescheduling_email, event, custom_message)
+
+    def get_event_details(self, event_id: str) -> Optional[Dict]:
+        """
+        Get details for a specific event.
+        Returns None if the event could not be fetched.
+        """
+        self._require_service()
+        try:
+            return self.service.events().get(
+                calendarId='primary',
+                eventId=event_id,
+                fields=EVENT_DETAIL_FIELDS
+            ).execute()
+        except Exception as e:
+            print(f"Error getting event details: {e}")
+            return None
+
+    def get_events_details(self, event_ids: List[str]) -> List[Optional[Dict]]:
+        """
+        Get details for several events, batching the lookups.
+        Returns the events in the order of event_ids, with None for any that could not be fetched.
+        """
+        self._require_service()
+        return self._execute_batch([
+            self.service.events().get(calendarId='primary', eventId=event_id, fields=EVENT_DETAIL_FIELDS)
+            for event_id in event_ids
+        ])
+
+    def create_event(self, summary: str, start_time: datetime, end_time: datetime,
+                     description: str = "", location: str = "", attendees: List[str] = None) -> Optional[Dict]:
+        """
+        Create a new calendar event and invite the attendees.
+        Returns the created event, or None on failure.
+        """
+        self._require_service()
+        try:
+            event_body = {
+                'summary': summary,
+                'location': location,
+                'description': description,
+                'start': {
+                    'dateTime': start_time.isoformat(),
+                    'timeZone': 'UTC',
+                },
+                'end': {
+                    'dateTime': end_time.isoformat(),
+                    'timeZone': 'UTC',
+                },
+            }
+            
+            if attendees:
+                event_body['attendees'] = [{'email': email} for email in attendees]
+            
+            return self.service.events().insert(
+                calendarId='primary',
+                body=event_body,
+                sendUpdates='all'
+            ).execute()
+        except Exception as e:
+            print(f"Error creating event: {e}")
+            return None
+
+    def cancel_event(self, event_id: str, send_notification: bool = True) -> bool:
+        """
+        Cancel (delete) a specific event.
+        Returns True on success.
+        """
+        self._require_service()
+        try:
+            self.service.events().delete(
+                calendarId='primary',
+                eventId=event_id,
+                sendNotifications=send_notification
+            ).execute()
+            return True
+        except Exception as e:
+            print(f"Error canceling event: {e}")
+            return False
+
+    def get_upcoming_events_count(self, days: int = 7) -> Tuple[int, Dict[str, List[Dict]]]:
+        """
+        Get the count and classified events for the next N days.
+        """
+        self._require_service()
+        start = datetime.utcnow()
+        end = start + timedelta(days=days)
+        
+        events = self.get_classified_events(start, end)
+        total_count = len(events['recurring']) + len(events['one_off'])
+        
+        return total_count, events
+
     def get_authenticated_user_email(self) -> str:
         """
         Get the email address of the authenticated user.
+        The address is fetched once and reused for the lifetime of the service.
         """
+        if self._user_email is not None:
+            return self._user_email
         try:
-            user_info_service = build('oauth2', 'v2', credentials=self.credentials)
-            user_info = user_info_service.userinfo().get().execute()
-            return user_info['email']
+            user_info = self.user_info_service.userinfo().get().execute()
+            self._user_email = user_info['email']
+            return self._user_email
         except Exception:
             return "me"  # Fallback to 'me' if we can't get the email
 
@@ -2,12 +2,18 @@
 Gradio chatbot interface for the Meeting Rescheduler Agent.
 """
 
-import os
+import asyncio
 import gradio as gr
-from typing import List, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from .llm.conversation import ConversationManager
+from .llm.state import CalendarEvent
 from .calendar_service import CalendarService
 
+# Number of rendered email bodies kept per bot
+TEMPLATE_CACHE_SIZE = 256
+
 class MeetingReschedulerBot:
     def __init__(self, openai_api_key: str = None):
         """Initialize the chatbot interface.
@@ -17,73 +23,148 @@ class MeetingReschedulerBot:
         """
         self.conversation = ConversationManager(api_key=openai_api_key)
         self.calendar_service = None
+        self._template_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+    
+    def reset_state(self) -> None:
+        """Start a new conversation, keeping the calendar connection."""
+        self.conversation.clear_history()
+        self.conversation.cache.clear()
+        self._template_cache.clear()
+    
+    def _render_email(self, template_id: str, meeting: CalendarEvent, state: Dict[str, Any]) -> str:
+        """Render an email template for a meeting, reusing identical renders.
+        
+        Args:
+            template_id: Template name ('recurring' or 'one_off')
+            meeting: The meeting from the conversation state
+            state: The current conversation state
+            
+        Returns:
+            The rendered email body
+        """
+        attendees = tuple(sorted(meeting.attendees))
+        key = (template_id, meeting.summary, meeting.start_time, attendees,
+               state.get('time_off_start'), state.get('time_off_end'))
+        if key in self._template_cache:
+            self._template_cache.move_to_end(key)
+            return self._template_cache[key]
+        
+        body = self.conversation.templates.render_email_template(
+            template_id,
+            meeting_name=meeting.summary,
+            attendee_name=attendees[0] if len(attendees) == 1 else 'all',
+            meeting_date=_format_date(meeting.start_time),
+            time_off_start=_format_date(state.get('time_off_start')),
+            time_off_end=_format_date(state.get('time_off_end')),
+            user_name=self.calendar_service.get_authenticated_user_email()
+        )
+        self._template_cache[key] = body
+        if len(self._template_cache) > TEMPLATE_CACHE_SIZE:
+            self._template_cache.popitem(last=False)
+        return body
+    
+    def _meetings_in_time_off(self, state: Dict[str, Any], is_recurring: bool) -> List[CalendarEvent]:
+        """Get the stored meetings of one kind that fall in the current time off.
+        
+        The time off may have changed since the meetings were fetched, so
+        meetings outside it are left alone.
+        
+        Args:
+            state: The current conversation state
+            is_recurring: Whether to get the recurring or the one-off meetings
+            
+        Returns:
+            The meetings, in the order they were added
+        """
+        meetings = self.conversation.state_manager.events_in_window(
+            state['time_off_start'], _end_of_time_off(state)
+        )
+        return [meeting for meeting in meetings if meeting.is_recurring == is_recurring]
     
-    async def chat(self, message: str, history: List[List[str]]) -> Tuple[str, List[List[str]]]:
-        """Process a chat message and return the response.
+    async def chat(self, message: str, history: List[List[str]]) -> AsyncIterator[Tuple[str, List[List[str]]]]:
+        """Process a chat message, streaming the response as it arrives.
         
         Args:
             message: The user's message
             history: The chat history
             
-        Returns:
-            Tuple of (bot response, updated history)
+        Yields:
+            Tuples of (textbox value, updated history)
         """
         try:
-            # Get response from LLM
-            response, state = await self.conversation.get_response(message)
+            # Stream the response from the LLM
+            async for partial in self.conversation.stream_response(message):
+                yield "", self.conversation.get_history()[:-1] + [[message, partial]]
+            state = self.conversation.state_manager.get_state()
+            
+            # Each requested action runs once; later turns must ask for it again
+            action = state.get('current_action')
+            if action:
+                self.conversation.state_manager.set_current_action(None)
             
             # Handle any calendar operations based on state
-            if state.get('current_action') == 'authenticate' and not state.get('authenticated'):
+            if action == 'authenticate' and not state.get('authenticated'):
                 # Initialize calendar service if needed
                 if not self.calendar_service:
-                    self.calendar_service = CalendarService()
-                    state['authenticated'] = True
+                    self.calendar_service = await asyncio.to_thread(CalendarService)
+                    self.conversation.state_manager.update_state(authenticated=True)
             
-            elif state.get('current_action') == 'get_meetings' and state.get('authenticated'):
+            elif action == 'get_meetings' and state.get('authenticated'):
                 # Fetch meetings if time period is set
                 if state.get('time_off_start') and state.get('time_off_end'):
-                    events = self.calendar_service.get_events(
+                    # Classify and store events; expanded instances carry their series' recurrence
+                    classified = await self.calendar_service.aget_classified_events(
                         start_date=state['time_off_start'],
-                        end_date=state['time_off_end']
+                        end_date=_end_of_time_off(state)
                     )
-                    # Classify and store events
-                    recurring, one_off = self.calendar_service.classify_events(events)
-                    for event in recurring:
-                        self.conversation.state_manager.add_calendar_event(event, is_recurring=True)
-                    for event in one_off:
+                    # Recurring meetings are cancelled a series at a time, so store one per series
+                    series = {}
+                    for event in classified['recurring']:
+                        series.setdefault(event.get('recurringEventId', event['id']), event)
+                    for series_id, event in series.items():
+                        self.conversation.state_manager.add_calendar_event({**event, 'id': series_id}, is_recurring=True)
+                    for event in classified['one_off']:
                         self.conversation.state_manager.add_calendar_event(event, is_recurring=False)
             
-            elif state.get('current_action') == 'cancel_recurring':
+            elif action == 'cancel_recurring' and state.get('time_off_start') and state.get('time_off_end'):
                 # Handle recurring meeting cancellations
-                for meeting in state.get('recurring_meetings', []):
+                for meeting in self._meetings_in_time_off(state, is_recurring=True):
                     if meeting.status == 'pending':
-                        self.calendar_service.cancel_recurring_meeting(meeting.event_id)
-                        self.conversation.state_manager.update_meeting_status(
+                        success, _ = await self.calendar_service.acancel_recurring_meetings(
                             meeting.event_id,
-                            'cancelled'
+                            state['time_off_start'],
+                            _end_of_time_off(state)
                         )
+                        if success:
+                            self.conversation.state_manager.update_meeting_status(
+                                meeting.event_id,
+                                'cancelled'
+                            )
             
-            elif state.get('current_action') == 'send_emails':
+            elif action == 'send_emails' and state.get('time_off_start') and state.get('time_off_end'):
                 # Handle email sending for one-off meetings
-                for meeting in state.get('one_off_meetings', []):
+                for meeting in self._meetings_in_time_off(state, is_recurring=False):
                     if meeting.status == 'pending':
-                        template = self.conversation.templates.get_email_template('one_off')
-                        self.calendar_service.send_rescheduling_email(
-                            meeting.event_id,
-                            template,
-                            meeting.attendees
-                        )
-                        self.conversation.state_manager.update_meeting_status(
-                            meeting.event_id,
-                            'notified'
-                        )
+                        body = self._render_email('one_off', meeting, state)
+                        event = {
+                            'id': meeting.event_id,
+                            'summary': meeting.summary,
+                            'organizer': {'email': meeting.organizer},
+                            'attendees': [{'email': email} for email in meeting.attendees]
+                        }
+                        success, _ = await self.calendar_service.asend_rescheduling_email(event, body)
+                        if success:
+                            self.conversation.state_manager.update_meeting_status(
+                                meeting.event_id,
+                                'notified'
+                            )
             
-            return response, self.conversation.get_history()
+            yield "", self.conversation.get_history()
             
         except Exception as error:
             error_message = f"An error occurred: {str(error)}"
             self.conversation.state_manager.set_error(error_message)
-            return error_message, self.conversation.get_history()
+            yield error_message, self.conversation.get_history()
     
     def create_interface(self) -> gr.Blocks:
         """Create the Gradio interface.
@@ -114,11 +195,19 @@ class MeetingReschedulerBot:
                 outputs=[msg, chatbot],
                 queue=False
             ).then(
-                lambda: self.conversation.clear_history()
+                self.reset_state
             )
         
         return interface
 
+def _end_of_time_off(state: Dict[str, Any]) -> datetime:
+    """Get the exclusive end bound of the time off, so its last day is included."""
+    return state['time_off_end'] + timedelta(days=1)
+
+def _format_date(value: Optional[datetime]) -> str:
+    """Format a date for an email body, or return an empty string if unset."""
+    return value.strftime('%B %d, %Y') if value else ''
+
 def create_chatbot(openai_api_key: str = None) -> gr.Blocks:
     """Create and return a new chatbot interface.
     
@@ -0,0 +1,261 @@
+"""
+Local intent parsing for the Meeting Rescheduler chat.
+
+Handles the common phrasings ("next 3 days", "next week", "tomorrow at 2pm",
+"July 1st to July 15th", attendee email addresses) without a round-trip to
+the LLM. Every parser returns None when it cannot confidently understand the
+text so callers can fall back to the LLM extractors.
+"""
+
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+MONTH_NAMES = (
+    'january', 'february', 'march', 'april', 'may', 'june', 'july',
+    'august', 'september', 'october', 'november', 'december'
+)
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+_NUMBER = r'(\d+|' + '|'.join(NUMBER_WORDS) + r')'
+# Full month names or their standard abbreviations only, so words such as
+# "maybe" or "decided" aren't read as months; MONTHS is keyed by the first 3 letters
+_MONTH = r'(' + '|'.join(MONTH_NAMES + ('sept',) + tuple(MONTHS)) + r')\b\.?'
+_DAY = r'(\d{1,2})(?:st|nd|rd|th)?'
+
+_NEXT_DAYS_RE = re.compile(r'next\s+' + _NUMBER + r'\s+days?')
+_NEXT_WEEKS_RE = re.compile(r'next\s+' + _NUMBER + r'\s+weeks?')
+_NEXT_WEEK_RE = re.compile(r'\bnext\s+week\b')
+_ISO_RANGE_RE = re.compile(r'\b(\d{4}-\d{2}-\d{2})\s*(?:to|through|until|-)\s*(\d{4}-\d{2}-\d{2})\b')
+_MONTH_RANGE_RE = re.compile(
+    r'\b' + _MONTH + r'\s+' + _DAY + r'\s*(?:to|through|until|-)\s*(?:' + _MONTH + r'\s+)?' + _DAY + r'\b'
+)
+_ISO_DATE_RE = re.compile(r'\b(\d{4}-\d{2}-\d{2})\b')
+_MONTH_DATE_RE = re.compile(r'\b' + _MONTH + r'\s+' + _DAY + r'\b')
+_WEEKDAY_RE = re.compile(r'\b(?:on\s+|next\s+)?(' + '|'.join(WEEKDAYS) + r')\b')
+_TIME_12H_RE = re.compile(r'\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m\.?\b')
+_TIME_24H_RE = re.compile(r'\bat\s+(\d{1,2}):(\d{2})\b')
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_TITLE_RE = re.compile(r'''(?:titled|called|named|about)\s+["'“‘](.+?)["'”’]''', re.IGNORECASE)
+
+# Chat intents in priority order. Each alternative is a zero-width lookahead
+# anchored at the start, so the first intent whose phrases appear anywhere in
+# the message wins and the whole check is a single regex call.
+_INTENT_RE = re.compile(
+    r'^(?:'
+    r'(?P<connect>(?=.*?connect)(?=.*?calendar))'
+    r'|(?P<upcoming>(?=.*?(?:how many meetings|upcoming events|upcoming meetings|schedule for next)))'
+    r'|(?P<create>(?=.*?(?:schedule a meeting|create an event|set up a meeting|arrange a meeting)))'
+    r'|(?P<cancel>(?=.*?cancel)(?=.*?(?:event|meeting)))'
+    r'|(?P<time_off>(?=.*?(?:time off|vacation|away|out of office)))'
+    r')',
+    re.IGNORECASE | re.DOTALL
+)
+_CALENDAR_RE = re.compile(r'schedule|create|cancel|upcoming|meetings|events', re.IGNORECASE)
+
+
+def match_intent(text: str) -> Optional[str]:
+    """Classify a chat message by keyword.
+
+    Args:
+        text: The user's message
+
+    Returns:
+        One of 'connect', 'upcoming', 'create', 'cancel', 'time_off', or None
+    """
+    match = _INTENT_RE.match(text)
+    return match.lastgroup if match else None
+
+
+def mentions_calendar(text: str) -> bool:
+    """Whether the message refers to a calendar operation."""
+    return _CALENDAR_RE.search(text) is not None
+
+
+def _to_int(value: str) -> int:
+    return NUMBER_WORDS.get(value) or int(value)
+
+
+@lru_cache(maxsize=256)
+def _parse_iso_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD date; each distinct string is only parsed once."""
+    return datetime.fromisoformat(value)
+
+
+def _next_occurrence(month: int, day: int, today: datetime) -> datetime:
+    """Return the next month/day on or after today, at midnight."""
+    candidate = datetime(today.year, month, day)
+    if candidate.date() < today.date():
+        candidate = candidate.replace(year=today.year + 1)
+    return candidate
+
+
+def parse_days(text: str) -> Optional[int]:
+    """Extract an "upcoming N days" window from text.
+
+    Args:
+        text: The user's message
+
+    Returns:
+        Number of days, or None if no window was mentioned
+    """
+    text = text.lower()
+    match = _NEXT_DAYS_RE.search(text)
+    if match:
+        return _to_int(match.group(1))
+    match = _NEXT_WEEKS_RE.search(text)
+    if match:
+        return 7 * _to_int(match.group(1))
+    if _NEXT_WEEK_RE.search(text):
+        return 7
+    if 'tomorrow' in text:
+        return 1
+    return None
+
+
+def parse_date_range(text: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+    """Extract a time off date range from text.
+
+    Args:
+        text: The user's message
+        now: Reference time, defaults to datetime.now()
+
+    Returns:
+        Tuple of (start, end) datetimes, or None if no range was recognised
+    """
+    text = text.lower()
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    match = _ISO_RANGE_RE.search(text)
+    if match:
+        try:
+            return _parse_iso_date(match.group(1)), _parse_iso_date(match.group(2))
+        except ValueError:
+            return None
+
+    match = _MONTH_RANGE_RE.search(text)
+    if match:
+        start_month = MONTHS[match.group(1)[:3]]
+        end_month = MONTHS[match.group(3)[:3]] if match.group(3) else start_month
+        try:
+            start = _next_occurrence(start_month, int(match.group(2)), today)
+            end = start.replace(month=end_month, day=int(match.group(4)))
+        except ValueError:
+            return None
+        if end < start:
+            end = end.replace(year=end.year + 1)
+        return start, end
+
+    if _NEXT_WEEK_RE.search(text):
+        start = today + timedelta(days=7 - today.weekday())  # Next Monday
+        return start, start + timedelta(days=7)
+
+    days = parse_days(text)
+    if days:
+        return now, now + timedelta(days=days)
+
+    return None
+
+
+def parse_event_datetime(text: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+    """Extract an event start time from text, assuming a 1 hour duration.
+
+    Both a day (today, tomorrow, a weekday or a date) and a time of day must be
+    present; anything less specific is left to the LLM.
+
+    Args:
+        text: The user's message
+        now: Reference time, defaults to datetime.now()
+
+    Returns:
+        Tuple of (start, end) datetimes, or None if the time is ambiguous
+    """
+    text = text.lower()
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if 'tomorrow' in text:
+        day = today + timedelta(days=1)
+    elif 'today' in text:
+        day = today
+    elif _ISO_DATE_RE.search(text):
+        try:
+            day = _parse_iso_date(_ISO_DATE_RE.search(text).group(1))
+        except ValueError:
+            return None
+    elif _MONTH_DATE_RE.search(text):
+        match = _MONTH_DATE_RE.search(text)
+        try:
+            day = _next_occurrence(MONTHS[match.group(1)[:3]], int(match.group(2)), today)
+        except ValueError:
+            return None
+    elif _WEEKDAY_RE.search(text):
+        weekday = WEEKDAYS[_WEEKDAY_RE.search(text).group(1)]
+        day = today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+    else:
+        return None
+
+    match = _TIME_12H_RE.search(text)
+    if match:
+        hour = int(match.group(1))
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match.group(3) == 'p' else 0)
+        minute = int(match.group(2) or 0)
+    else:
+        match = _TIME_24H_RE.search(text)
+        if not match:
+            return None
+        hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+
+    start = day.replace(hour=hour, minute=minute)
+    return start, start + timedelta(hours=1)
+
+
+def extract_emails(text: str) -> List[str]:
+    """Extract attendee email addresses from text, preserving order."""
+    return list(dict.fromkeys(_EMAIL_RE.findall(text)))
+
+
+def parse_event_details(text: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Extract event details from text without calling the LLM.
+
+    Succeeds only when both an explicit title (e.g. "titled 'Project Review'")
+    and an unambiguous start time are present.
+
+    Args:
+        text: The user's message
+        now: Reference time, defaults to datetime.now()
+
+    Returns:
+        Dictionary in the same shape as app.extract_intent, or None
+    """
+    title = _TITLE_RE.search(text)
+    times = parse_event_datetime(text, now)
+    if not title or not times:
+        return None
+
+    return {
+        "intent": "create_event",
+        "summary": title.group(1),
+        "description": "",
+        "location": "",
+        "attendees": extract_emails(text),
+        "start": times[0],
+        "end": times[1]
+    }
@@ -0,0 +1,135 @@
+"""
+Response caching for the Meeting Rescheduler Agent.
+Reuses LLM replies for repeated or near-duplicate messages sent in the same
+conversation state.
+"""
+
+import hashlib
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it only exact matches are cached
+    np = None
+
+class ResponseCache:
+    def __init__(self, ttl: float = 300, max_entries: int = 1000, similarity_threshold: float = 0.90,
+                 semantic: bool = True):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a cached response stays valid
+            max_entries: Maximum number of responses kept in each tier
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            semantic: Whether to keep the semantic tier (also requires numpy)
+        """
+        self._semantic = semantic
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+
+        # Exact tier: key -> (expiry, response)
+        self._exact: Dict[str, Tuple[float, str]] = {}
+
+        # Semantic tier: one row of unit-length embeddings per entry
+        self._embeddings = None
+        self._entries: List[Tuple[float, str, str]] = []  # (expiry, state digest, response)
+
+    @property
+    def semantic(self) -> bool:
+        """Whether near-duplicate lookups are enabled and available."""
+        return self._semantic and np is not None
+
+    @staticmethod
+    def digest(*parts: str) -> str:
+        """Hash the given strings into a cache key."""
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get_exact(self, key: str) -> Optional[str]:
+        """Get the response cached under an exact key.
+
+        Args:
+            key: Key built with digest()
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._exact[key]
+            return None
+        return entry[1]
+
+    def get_similar(self, embedding: Optional[Sequence[float]], state_digest: str) -> Optional[str]:
+        """Get the response cached for the most similar message in the same state.
+
+        Args:
+            embedding: Embedding of the user's message
+            state_digest: Digest of the current conversation state
+
+        Returns:
+            The cached response, or None if nothing is similar enough
+        """
+        vector = self._normalise(embedding)
+        if vector is None or self._embeddings is None:
+            return None
+
+        scores = self._embeddings @ vector
+        now = time.monotonic()
+        for index in np.argsort(scores)[::-1]:
+            if scores[index] < self.similarity_threshold:
+                break
+            expiry, digest, response = self._entries[index]
+            # Entries from an older state are stale for this conversation
+            if digest == state_digest and expiry >= now:
+                return response
+        return None
+
+    def put(self, key: str, state_digest: str, response: str,
+            embedding: Optional[Sequence[float]] = None) -> None:
+        """Cache a response.
+
+        Args:
+            key: Exact key built with digest()
+            state_digest: Digest of the conversation state the response was made in
+            response: The LLM's response text
+            embedding: Embedding of the user's message, if available
+        """
+        expiry = time.monotonic() + self.ttl
+        self._exact[key] = (expiry, response)
+        if len(self._exact) > self.max_entries:
+            del self._exact[next(iter(self._exact))]
+
+        vector = self._normalise(embedding)
+        if vector is None:
+            return
+        if self._embeddings is None:
+            self._embeddings = vector[np.newaxis, :]
+        else:
+            self._embeddings = np.vstack([self._embeddings, vector])[-self.max_entries:]
+        self._entries.append((expiry, state_digest, response))
+        del self._entries[:-self.max_entries]
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._exact.clear()
+        self._embeddings = None
+        self._entries = []
+
+    def _normalise(self, embedding: Optional[Sequence[float]]):
+        """Convert an embedding to a unit-length vector, or None if it can't be used."""
+        if embedding is None or not self.semantic:
+            return None
+        try:
+            vector = np.asarray(embedding, dtype=np.float32).ravel()
+        except (TypeError, ValueError):
+            return None
+        norm = np.linalg.norm(vector)
+        if not vector.size or not norm:
+            return None
+        if self._embeddings is not None and vector.shape[0] != self._embeddings.shape[1]:
+            return None
+        return vector / norm
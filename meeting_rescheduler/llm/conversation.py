@@ -4,11 +4,59 @@ Handles all LLM interactions and maintains conversation state.
 """
 
 import os
-from typing import List, Dict, Optional, Tuple, Any
-import openai
+import asyncio
+import hashlib
+import json
+import logging
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Any
 from openai import AsyncOpenAI
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; state digests fall back to the json module
+    orjson = None
+
+from .cache import ResponseCache
 from .state import StateManager
-from .templates import PromptTemplates
+from .templates import TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+# Function the model calls to move the conversation to its next calendar step
+CALENDAR_TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "calendar_action",
+        "description": "Start a calendar step once the user has asked for it or confirmed it.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["authenticate", "get_meetings", "cancel_recurring", "send_emails"],
+                    "description": "authenticate: connect Google Calendar; get_meetings: fetch the meetings in the time off period; cancel_recurring: cancel the pending recurring meetings; send_emails: email the organizers of the pending one-off meetings"
+                },
+                "time_off_start": {
+                    "type": "string",
+                    "description": "First day of the time off period, YYYY-MM-DD"
+                },
+                "time_off_end": {
+                    "type": "string",
+                    "description": "Last day of the time off period, YYYY-MM-DD"
+                }
+            },
+            "required": ["action"]
+        }
+    }
+}]
+
+# Reply shown when the model calls calendar_action without any text
+ACTION_REPLIES = {
+    'authenticate': "Connecting to your Google Calendar...",
+    'get_meetings': "Looking up your meetings for that period...",
+    'cancel_recurring': "Cancelling your recurring meetings...",
+    'send_emails': "Sending the rescheduling emails..."
+}
 
 class Message:
     """Simple message class to replace LangChain's message types."""
@@ -20,11 +68,21 @@ class Message:
         return {"role": self.role, "content": self.content}
 
 class ConversationManager:
-    def __init__(self, api_key: Optional[str] = None):
+    # Actions whose replies drive calendar changes, so they are never replayed from cache
+    UNCACHED_ACTIONS = {'authenticate', 'get_meetings', 'cancel_recurring', 'send_emails'}
+    MODEL = "gpt-4o-mini"
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    # Number of rendered state prompts kept
+    STATE_PROMPT_CACHE_SIZE = 64
+
+    def __init__(self, api_key: Optional[str] = None, semantic_cache: bool = False):
         """Initialize the conversation manager.
         
         Args:
             api_key: OpenAI API key. If not provided, will look for OPENAI_API_KEY env var.
+            semantic_cache: Whether to also answer near-duplicate messages from the
+                cache. Each cache miss then sends an embeddings request alongside
+                the chat request.
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -32,12 +90,21 @@ class ConversationManager:
         
         self.client = AsyncOpenAI(api_key=self.api_key)
         self.state_manager = StateManager()
-        self.templates = PromptTemplates()
+        self.templates = TEMPLATES
+        self.cache = ResponseCache(semantic=semantic_cache)
         
         # Initialize conversation with system message
         self.messages: List[Message] = [
             Message("system", self.templates.get_system_prompt())
         ]
+        # Requests share the system prompt and tool manifest as a fixed prefix,
+        # so route them to the same OpenAI prompt cache
+        self._prompt_cache_key = "meeting-rescheduler-" + ResponseCache.digest(
+            self.messages[0].content, json.dumps(CALENDAR_TOOLS, sort_keys=True)
+        )[:16]
+        # API-ready copies of self.messages, kept in step by add_message
+        self._msg_dicts: List[Dict[str, str]] = [self.messages[0].to_dict()]
+        self._state_prompt_cache: Dict[str, str] = {}
         
         # Initialize chat history
         self.history: List[List[str]] = []
@@ -51,6 +118,7 @@ class ConversationManager:
         """
         role = "user" if is_human else "assistant"
         self.messages.append(Message(role, message))
+        self._msg_dicts.append(self.messages[-1].to_dict())
         
         # Update chat history for Gradio display
         if is_human:
@@ -68,44 +136,215 @@ class ConversationManager:
         Returns:
             Tuple of (response text, updated state)
         """
-        # Add user message to history
-        self.add_message(message, is_human=True)
-        
-        # Get current state and add to context
-        current_state = self.state_manager.get_state()
-        context_message = self.templates.get_state_prompt(current_state)
-        
-        # Add state context as a system message
-        messages_for_api = [msg.to_dict() for msg in self.messages]
-        messages_for_api.append({"role": "system", "content": context_message})
+        messages_for_api, context_digest, cache_key = self._start_turn(message)
         
         try:
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=messages_for_api,
-                temperature=0.7,
-                max_tokens=1000
-            )
+            response_text = self.cache.get_exact(cache_key) if cache_key else None
             
-            response_text = response.choices[0].message.content
+            if response_text is None:
+                # Call OpenAI API, checking for a near-duplicate while it is in flight
+                request = asyncio.ensure_future(self.client.chat.completions.create(
+                    model=self.MODEL,
+                    messages=messages_for_api,
+                    tools=CALENDAR_TOOLS,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    extra_body={"prompt_cache_key": self._prompt_cache_key}
+                ))
+                response_text, embedding = await self._similar_response(message, context_digest, cache_key, request)
             
-            # Add AI response to history
-            self.add_message(response_text, is_human=False)
+            if response_text is None:
+                response = await request
+                
+                reply = response.choices[0].message
+                tool_calls = [
+                    (tool_call.function.name, tool_call.function.arguments)
+                    for tool_call in reply.tool_calls or []
+                ]
+                response_text = reply.content or _action_reply(tool_calls)
+                # Tool calls change state, so only plain replies are replayed
+                if cache_key and not tool_calls:
+                    self.cache.put(cache_key, context_digest, response_text, embedding)
+                return response_text, self._finish_turn(response_text, tool_calls)
             
-            # Update state based on response
-            updated_state = self.state_manager.update_from_response(response_text)
+            return response_text, self._finish_turn(response_text)
             
-            return response_text, updated_state
+        except Exception as error:
+            error_message = f"Error getting LLM response: {str(error)}"
+            self.state_manager.set_error(error_message)
+            raise
+    
+    async def stream_response(self, message: str) -> AsyncIterator[str]:
+        """Stream a response from the LLM for the given message.
+        
+        Once the stream ends, the response is added to the history and the
+        state is updated as in get_response. If the caller stops reading
+        early, the text received so far is still recorded as the AI's turn.
+        
+        Args:
+            message: The user's message
+            
+        Yields:
+            The response text received so far
+        """
+        messages_for_api, context_digest, cache_key = self._start_turn(message)
+        # Text and tool calls recorded as the AI's turn, even if the caller stops early
+        recorded_text = ""
+        tool_calls = None
+        
+        try:
+            response_text = self.cache.get_exact(cache_key) if cache_key else None
+            
+            if response_text is None:
+                # Call OpenAI API, checking for a near-duplicate while it is in flight
+                request = asyncio.ensure_future(self.client.chat.completions.create(
+                    model=self.MODEL,
+                    messages=messages_for_api,
+                    tools=CALENDAR_TOOLS,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    stream=True,
+                    extra_body={"prompt_cache_key": self._prompt_cache_key}
+                ))
+                response_text, embedding = await self._similar_response(message, context_digest, cache_key, request)
+            
+            if response_text is not None:
+                recorded_text = response_text
+                yield response_text
+            else:
+                stream = await request
+                
+                # Tool call name and argument fragments, by tool call index
+                streamed_calls: Dict[int, List[str]] = {}
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    for tool_call in delta.tool_calls or []:
+                        call = streamed_calls.setdefault(tool_call.index, ["", ""])
+                        call[0] += tool_call.function.name or ""
+                        call[1] += tool_call.function.arguments or ""
+                    if delta.content:
+                        recorded_text += delta.content
+                        yield recorded_text
+                
+                # Tool calls are only applied, and replies only cached, once the stream is complete
+                tool_calls = [tuple(call) for call in streamed_calls.values()]
+                if not recorded_text:
+                    recorded_text = _action_reply(tool_calls)
+                    yield recorded_text
+                if cache_key and not tool_calls:
+                    self.cache.put(cache_key, context_digest, recorded_text, embedding)
             
         except Exception as error:
             error_message = f"Error getting LLM response: {str(error)}"
             self.state_manager.set_error(error_message)
             raise
+        
+        finally:
+            # Record the AI's turn, even if the consumer stopped reading early
+            if recorded_text or tool_calls:
+                self._finish_turn(recorded_text, tool_calls)
+    
+    def _start_turn(self, message: str) -> Tuple[List[Dict[str, str]], str, Optional[str]]:
+        """Record the user's message and build the request for it.
+        
+        Args:
+            message: The user's message
+            
+        Returns:
+            Tuple of (API messages, digest of the state and the preceding
+            message, cache key or None if the response must not be cached)
+        """
+        # Add user message to history
+        self.add_message(message, is_human=True)
+        
+        # Get current state and add to context
+        current_state = self.state_manager.get_state()
+        state_digest, context_message = self._state_prompt(current_state)
+        
+        # Add state context as a system message after the history, keeping the
+        # system prompt and earlier turns a stable, cacheable prefix
+        messages_for_api = self._msg_dicts + [{"role": "system", "content": context_message}]
+        
+        # A short reply such as "yes" means something different after each
+        # question, so cached replies are keyed by the preceding message too
+        context_digest = ResponseCache.digest(state_digest, self.messages[-2].content)
+        
+        cache_key = None
+        if current_state.get('current_action') not in self.UNCACHED_ACTIONS:
+            cache_key = ResponseCache.digest(self.messages[0].content, context_digest, message)
+        return messages_for_api, context_digest, cache_key
+    
+    async def _similar_response(self, message: str, context_digest: str, cache_key: Optional[str],
+                                request: "asyncio.Future") -> Tuple[Optional[str], Optional[List[float]]]:
+        """Look up a cached response for a near-duplicate of the message.
+        
+        Runs while the chat request is in flight, and cancels it on a hit.
+        Does nothing unless semantic caching is enabled.
+        
+        Returns:
+            Tuple of (cached response or None, message embedding to cache a new
+            response under)
+        """
+        if not cache_key or not self.cache.semantic:
+            return None, None
+        embedding = await self._embed(message)
+        response_text = self.cache.get_similar(embedding, context_digest)
+        if response_text is not None:
+            await _discard(request)
+        return response_text, embedding
+    
+    def _finish_turn(self, response_text: str, tool_calls: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+        """Record the AI's response and return the updated state.
+        
+        Args:
+            response_text: The AI's response
+            tool_calls: (name, JSON arguments) of each tool call in the response
+        """
+        # Add AI response to history
+        self.add_message(response_text, is_human=False)
+        
+        # Update state from the tool calls, falling back to the response text
+        if tool_calls:
+            for name, arguments in tool_calls:
+                updated_state = self.state_manager.apply_tool_call(name, arguments)
+            return updated_state
+        return self.state_manager.update_from_response(response_text)
+    
+    def _state_prompt(self, state: Dict[str, Any]) -> Tuple[str, str]:
+        """Get the state prompt, rendering it only when the state has changed.
+        
+        Args:
+            state: Current conversation state dictionary
+            
+        Returns:
+            Tuple of (state digest, state prompt)
+        """
+        state_digest = hashlib.blake2b(_serialize_state(state), digest_size=8).hexdigest()
+        prompt = self._state_prompt_cache.get(state_digest)
+        if prompt is None:
+            prompt = self.templates.get_state_prompt(state)
+            self._state_prompt_cache[state_digest] = prompt
+            if len(self._state_prompt_cache) > self.STATE_PROMPT_CACHE_SIZE:
+                del self._state_prompt_cache[next(iter(self._state_prompt_cache))]
+        return state_digest, prompt
+    
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed a message for the semantic cache, or return None if unavailable."""
+        if not self.cache.semantic:
+            return None
+        try:
+            result = await self.client.embeddings.create(model=self.EMBEDDING_MODEL, input=text)
+            return result.data[0].embedding
+        except Exception as error:
+            logger.warning("Error embedding message: %s", error)
+            return None
     
     def clear_history(self) -> None:
         """Clear the conversation history but keep the system message."""
         self.messages = [self.messages[0]]  # Keep system message
+        self._msg_dicts = [self._msg_dicts[0]]
         self.history = []
         self.state_manager.reset()
     
@@ -115,4 +354,31 @@ class ConversationManager:
         Returns:
             List of message pairs [user_message, bot_message]
         """
-        return self.history 
\ No newline at end of file
+        return self.history
+
+def _serialize_state(state: Dict[str, Any]) -> bytes:
+    """Serialize a state dictionary deterministically for hashing."""
+    if orjson is not None:
+        # Handles the CalendarEvent dataclasses and datetimes natively
+        return orjson.dumps(state, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(state, sort_keys=True, default=str).encode("utf-8")
+
+async def _discard(request: "asyncio.Future") -> None:
+    """Cancel a chat request, closing its response stream if it has already opened."""
+    if request.cancel():
+        return
+    if not request.cancelled() and request.exception() is None:
+        close = getattr(request.result(), "close", None)
+        if close is not None:
+            await close()
+
+def _action_reply(tool_calls: List[Tuple[str, str]]) -> str:
+    """Build a reply for a response that only contains tool calls."""
+    for name, arguments in tool_calls:
+        try:
+            action = json.loads(arguments or "{}").get("action")
+        except (AttributeError, ValueError):
+            continue
+        if action in ACTION_REPLIES:
+            return ACTION_REPLIES[action]
+    return ""
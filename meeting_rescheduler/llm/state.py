@@ -3,11 +3,20 @@ State management for the Meeting Rescheduler Agent.
 Handles tracking and updating the conversation state.
 """
 
-from typing import Dict, Optional, List
-from datetime import datetime
-from pydantic import BaseModel, Field
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Dict, Optional, List, Tuple
+from datetime import datetime, timezone
 
-class CalendarEvent(BaseModel):
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it window lookups scan the meetings
+    np = None
+
+@dataclass(slots=True)
+class CalendarEvent:
     """Model for calendar events."""
     event_id: str
     summary: str
@@ -18,38 +27,110 @@ class CalendarEvent(BaseModel):
     organizer: str
     status: str = "pending"  # pending, cancelled, notified
 
-class ConversationState(BaseModel):
+    @classmethod
+    def from_api(cls, event_data: Dict, is_recurring: bool) -> "CalendarEvent":
+        """Build an event from trusted Google Calendar data.
+        
+        Accepts either a Calendar API event resource, or a dictionary that
+        already has start_time/end_time datetimes, attendee emails and the
+        organizer's email. Times are stored as aware UTC datetimes; all-day
+        dates and naive datetimes are taken to be UTC.
+        
+        Args:
+            event_data: Dictionary containing event information
+            is_recurring: Whether this is a recurring meeting
+        """
+        if 'start_time' in event_data:
+            start_time, end_time = _as_utc(event_data['start_time']), _as_utc(event_data['end_time'])
+            attendees, organizer = event_data['attendees'], event_data['organizer']
+        else:
+            start_time = _parse_api_time(event_data['start'])
+            end_time = _parse_api_time(event_data['end'])
+            attendees = [a['email'] for a in event_data.get('attendees', []) if 'email' in a]
+            organizer = event_data.get('organizer', {}).get('email', '')
+        return cls(
+            event_id=event_data['id'],
+            summary=event_data.get('summary', ''),
+            start_time=start_time,
+            end_time=end_time,
+            is_recurring=is_recurring,
+            attendees=attendees,
+            organizer=organizer
+        )
+
+def _parse_api_time(value: Dict) -> datetime:
+    """Parse a Calendar API start/end object (dateTime, or date for all-day events)."""
+    return _as_utc(datetime.fromisoformat(value.get('dateTime') or value['date']))
+
+def _as_utc(value: datetime) -> datetime:
+    """Convert a datetime to aware UTC, taking naive values to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+@dataclass(slots=True)
+class ConversationState:
     """Model for conversation state."""
     authenticated: bool = False
     time_off_start: Optional[datetime] = None
     time_off_end: Optional[datetime] = None
-    recurring_meetings: List[CalendarEvent] = Field(default_factory=list)
-    one_off_meetings: List[CalendarEvent] = Field(default_factory=list)
+    recurring_meetings: List[CalendarEvent] = field(default_factory=list)
+    one_off_meetings: List[CalendarEvent] = field(default_factory=list)
     current_meeting_index: int = 0
-    email_templates: Dict[str, str] = Field(default_factory=dict)
+    email_templates: Dict[str, str] = field(default_factory=dict)
     current_action: Optional[str] = None  # authenticate, set_dates, review_meetings, etc.
     last_error: Optional[str] = None
 
+# Time off range mentioned in a plain-text LLM response. Actions are never read
+# from text, where "Shall I go ahead with cancelling...?" reads like a go-ahead;
+# only calendar_action tool calls start them.
+_TIME_OFF_RE = re.compile(
+    r'\b(?P<start>\d{4}-\d{2}-\d{2})\s*(?:to|through|until|-)\s*(?P<end>\d{4}-\d{2}-\d{2})\b'
+)
+
+# Field names read by StateManager.get_state and accepted by update_state
+_STATE_FIELDS = tuple(f.name for f in fields(ConversationState))
+_STATE_FIELD_NAMES = frozenset(_STATE_FIELDS)
+
 class StateManager:
+    # Number of events_in_window results kept
+    WINDOW_CACHE_SIZE = 16
+
     def __init__(self):
         """Initialize the state manager."""
         self.state = ConversationState()
+        # Meetings in the state, by event ID
+        self._by_id: Dict[str, CalendarEvent] = {}
+        # Start/end epoch seconds of self._by_id's meetings, built on demand
+        self._time_columns = None
+        # events_in_window results by (version, start, end); the version is
+        # bumped whenever meetings are added or removed, so older entries never match
+        self._version = 0
+        self._window_cache: "OrderedDict[Tuple, List[CalendarEvent]]" = OrderedDict()
     
     def get_state(self) -> Dict:
-        """Get the current state as a dictionary."""
-        return self.state.model_dump()
+        """Get the current state as a dictionary.
+        
+        The dictionary is a shallow copy: meetings are the CalendarEvent
+        objects held in the state, not copies converted to dictionaries.
+        """
+        state = self.state
+        return {name: getattr(state, name) for name in _STATE_FIELDS}
     
     def update_state(self, **kwargs) -> None:
         """Update specific state fields."""
+        state = self.state
         for key, value in kwargs.items():
-            if hasattr(self.state, key):
-                setattr(self.state, key, value)
+            if key in _STATE_FIELD_NAMES:
+                setattr(state, key, value)
     
     def update_from_response(self, response: str) -> Dict:
         """Update state based on LLM response.
         
-        This method analyzes the LLM response and updates the state accordingly.
-        It looks for specific patterns that indicate state changes.
+        Fallback for responses without tool calls: only a time off range
+        mentioned in the text is picked up. The current action is left
+        unchanged, since calendar actions only start from a calendar_action
+        tool call (see apply_tool_call).
         
         Args:
             response: The LLM's response text
@@ -57,56 +138,143 @@ class StateManager:
         Returns:
             Updated state as dictionary
         """
-        # TODO: Implement response parsing logic
-        # This will involve looking for specific patterns in the response
-        # that indicate state changes, such as:
-        # - Authentication status changes
-        # - Time off date settings
-        # - Meeting status updates
-        # - Email template changes
+        for match in _TIME_OFF_RE.finditer(response):
+            try:
+                start = datetime.fromisoformat(match.group('start'))
+                end = datetime.fromisoformat(match.group('end'))
+            except ValueError:
+                continue
+            self.state.time_off_start, self.state.time_off_end = start, end
+        
+        return self.get_state()
+    
+    def apply_tool_call(self, name: str, arguments: str) -> Dict:
+        """Update state from a calendar_action tool call.
+        
+        Args:
+            name: Name of the called tool
+            arguments: JSON-encoded tool arguments
+            
+        Returns:
+            Updated state as dictionary
+        """
+        if name != 'calendar_action':
+            return self.get_state()
+        try:
+            args = json.loads(arguments or '{}')
+        except ValueError:
+            return self.get_state()
+        
+        if args.get('action'):
+            self.set_current_action(args['action'])
+        for key in ('time_off_start', 'time_off_end'):
+            if args.get(key):
+                try:
+                    setattr(self.state, key, datetime.fromisoformat(args[key]))
+                except ValueError:
+                    pass
         
         return self.get_state()
     
     def add_calendar_event(self, event_data: Dict, is_recurring: bool) -> None:
         """Add a calendar event to the state.
         
+        An event already in the state (same event ID) is replaced rather than
+        added twice.
+        
         Args:
             event_data: Dictionary containing event information
             is_recurring: Whether this is a recurring meeting
         """
-        event = CalendarEvent(
-            event_id=event_data['id'],
-            summary=event_data['summary'],
-            start_time=event_data['start_time'],
-            end_time=event_data['end_time'],
-            is_recurring=is_recurring,
-            attendees=event_data['attendees'],
-            organizer=event_data['organizer']
-        )
+        event = CalendarEvent.from_api(event_data, is_recurring)
+        meetings = self.state.recurring_meetings if is_recurring else self.state.one_off_meetings
         
-        if is_recurring:
-            self.state.recurring_meetings.append(event)
+        previous = self._by_id.get(event.event_id)
+        if previous is None:
+            meetings.append(event)
         else:
-            self.state.one_off_meetings.append(event)
+            # A re-fetched meeting replaces the stored one, keeping its progress
+            event.status = previous.status
+            previous_meetings = self.state.recurring_meetings if previous.is_recurring else self.state.one_off_meetings
+            index = next(i for i, meeting in enumerate(previous_meetings) if meeting is previous)
+            if previous_meetings is meetings:
+                meetings[index] = event
+            else:
+                del previous_meetings[index]
+                meetings.append(event)
+        self._by_id[event.event_id] = event
+        self._time_columns = None
+        self._version += 1
+    
+    def events_in_window(self, start: datetime, end: datetime) -> List[CalendarEvent]:
+        """Get the meetings that overlap a time window.
+        
+        Args:
+            start: Start of the window (naive values are taken to be UTC)
+            end: End of the window (naive values are taken to be UTC)
+            
+        Returns:
+            Meetings that start before end and finish after start, in the
+            order they were added
+        """
+        # Meetings hold aware UTC times, so the bounds must be comparable with them
+        start, end = _as_utc(start), _as_utc(end)
+        key = (self._version, start, end)
+        cached = self._window_cache.get(key)
+        if cached is not None:
+            self._window_cache.move_to_end(key)
+            return list(cached)
+        
+        # A narrower window only needs to filter the result of a wider one
+        for (version, cached_start, cached_end), wider in reversed(self._window_cache.items()):
+            if version == self._version and cached_start <= start and end <= cached_end:
+                result = [m for m in wider if m.start_time < end and m.end_time > start]
+                break
+        else:
+            result = self._filter_window(start, end)
+        
+        self._window_cache[key] = result
+        if len(self._window_cache) > self.WINDOW_CACHE_SIZE:
+            self._window_cache.popitem(last=False)
+        return list(result)
+    
+    def _filter_window(self, start: datetime, end: datetime) -> List[CalendarEvent]:
+        """Find the meetings overlapping a window by checking every meeting."""
+        meetings = list(self._by_id.values())
+        if np is None:
+            return [m for m in meetings if m.start_time < end and m.end_time > start]
+        
+        if self._time_columns is None:
+            self._time_columns = (
+                np.fromiter((m.start_time.timestamp() for m in meetings), dtype=np.float64, count=len(meetings)),
+                np.fromiter((m.end_time.timestamp() for m in meetings), dtype=np.float64, count=len(meetings))
+            )
+        starts, ends = self._time_columns
+        mask = (starts < end.timestamp()) & (ends > start.timestamp())
+        return [meetings[i] for i in np.flatnonzero(mask)]
     
     def update_meeting_status(self, event_id: str, status: str) -> None:
         """Update the status of a meeting.
         
+        add_calendar_event keeps one meeting per event ID, so the meeting in
+        _by_id is the only copy in the state's lists. Cached events_in_window
+        results hold that same meeting and don't depend on its status, so
+        they stay valid.
+        
         Args:
             event_id: The ID of the event to update
             status: New status (pending, cancelled, notified)
         """
-        for meetings in [self.state.recurring_meetings, self.state.one_off_meetings]:
-            for meeting in meetings:
-                if meeting.event_id == event_id:
-                    meeting.status = status
-                    break
+        meeting = self._by_id.get(event_id)
+        if meeting is not None:
+            meeting.status = status
     
-    def set_current_action(self, action: str) -> None:
+    def set_current_action(self, action: Optional[str]) -> None:
         """Set the current action being performed.
         
         Args:
-            action: The current action (authenticate, set_dates, review_meetings, etc.)
+            action: The current action (authenticate, set_dates, review_meetings, etc.),
+                or None once it has been handled
         """
         self.state.current_action = action
     
@@ -124,4 +292,8 @@ class StateManager:
     
     def reset(self) -> None:
         """Reset the state to initial values."""
-        self.state = ConversationState() 
\ No newline at end of file
+        self.state = ConversationState()
+        self._by_id = {}
+        self._time_columns = None
+        self._version += 1
+        self._window_cache.clear() 
\ No newline at end of file
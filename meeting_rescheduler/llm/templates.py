@@ -3,13 +3,17 @@ Prompt templates for the Meeting Rescheduler Agent.
 Manages system prompts and state-specific prompts.
 """
 
-from typing import Dict
-import json
+from string import Formatter
+from typing import Dict, Tuple
 
-class PromptTemplates:
-    def get_system_prompt(self) -> str:
-        """Get the system prompt that defines the agent's behavior."""
-        return """You are a helpful meeting rescheduler assistant. Your role is to help users manage their calendar during time off periods.
+_NEWLINE = "\n"
+
+# Closing instructions appended after the state summary
+_STATE_PROMPT_FOOTER = """
+Remember this state while responding to the user. Guide them through any incomplete steps and help them accomplish their goal of managing calendar events during their time off."""
+
+# Defines the agent's behavior; sent as the first message of every conversation
+_SYSTEM_PROMPT = """You are a helpful meeting rescheduler assistant. Your role is to help users manage their calendar during time off periods.
 
 Your capabilities include:
 1. Authenticating with Google Calendar
@@ -24,6 +28,7 @@ Always:
 - Keep track of the current state
 - Handle errors gracefully
 - Provide clear status updates
+- Call calendar_action when the user asks for or confirms a calendar step
 
 Never:
 - Make assumptions about dates or times
@@ -33,6 +38,46 @@ Never:
 
 Start by asking how you can help with calendar management today."""
 
+# Email templates by meeting type
+_EMAIL_TEMPLATES = {
+    'recurring': """Subject: Cancellation Notice: {meeting_name}
+
+Hi {attendee_name},
+
+I hope this email finds you well. I wanted to let you know that I'll be taking some time off from {time_off_start} to {time_off_end}, and as a result, our recurring meeting "{meeting_name}" will be cancelled during this period.
+
+We can resume our regular schedule when I return.
+
+Best regards,
+{user_name}""",
+    
+    'one_off': """Subject: Unable to Attend: {meeting_name}
+
+Hi {attendee_name},
+
+I hope you're doing well. I wanted to let you know that I'll be unavailable for our scheduled meeting "{meeting_name}" on {meeting_date} as I will be taking some time off.
+
+Would it be possible to reschedule this meeting for after my return on {time_off_end}?
+
+Best regards,
+{user_name}"""
+}
+
+# Email templates split into (literal text, field name, format spec) chunks
+# once, so filling one in is a plain join
+_PARSED_EMAIL_TEMPLATES: Dict[str, Tuple[Tuple[str, str, str], ...]] = {
+    name: tuple(
+        (literal, field or "", spec or "")
+        for literal, field, spec, _ in Formatter().parse(template)
+    )
+    for name, template in _EMAIL_TEMPLATES.items()
+}
+
+class PromptTemplates:
+    def get_system_prompt(self) -> str:
+        """Get the system prompt that defines the agent's behavior."""
+        return _SYSTEM_PROMPT
+
     def get_state_prompt(self, state: Dict) -> str:
         """Get a prompt that includes the current conversation state.
         
@@ -42,40 +87,23 @@ Start by asking how you can help with calendar management today."""
         Returns:
             A prompt string that includes relevant state information
         """
-        # Convert state to a readable format
-        state_summary = []
-        
-        if state.get('authenticated'):
-            state_summary.append("✓ User is authenticated")
-        else:
-            state_summary.append("⨯ User needs to authenticate")
-            
-        if state.get('time_off_start') and state.get('time_off_end'):
-            state_summary.append(
-                f"Time off period: {state['time_off_start']} to {state['time_off_end']}"
-            )
-            
-        if state.get('recurring_meetings'):
-            count = len(state['recurring_meetings'])
-            state_summary.append(f"Found {count} recurring meetings")
-            
-        if state.get('one_off_meetings'):
-            count = len(state['one_off_meetings'])
-            state_summary.append(f"Found {count} one-off meetings")
-            
-        if state.get('current_action'):
-            state_summary.append(f"Current action: {state['current_action']}")
-            
-        if state.get('last_error'):
-            state_summary.append(f"Last error: {state['last_error']}")
-        
-        # Create the state-aware prompt
-        prompt = f"""Current State:
-{chr(10).join(f'- {item}' for item in state_summary)}
-
-Remember this state while responding to the user. Guide them through any incomplete steps and help them accomplish their goal of managing calendar events during their time off."""
-        
-        return prompt
+        start, end = state.get('time_off_start'), state.get('time_off_end')
+        recurring = state.get('recurring_meetings')
+        one_off = state.get('one_off_meetings')
+        action = state.get('current_action')
+        error = state.get('last_error')
+
+        # One "- item" line per known piece of state, built in a single pass
+        return (
+            "Current State:\n"
+            f"{'- ✓ User is authenticated' if state.get('authenticated') else '- ⨯ User needs to authenticate'}\n"
+            f"{f'- Time off period: {start} to {end}{_NEWLINE}' if start and end else ''}"
+            f"{f'- Found {len(recurring)} recurring meetings{_NEWLINE}' if recurring else ''}"
+            f"{f'- Found {len(one_off)} one-off meetings{_NEWLINE}' if one_off else ''}"
+            f"{f'- Current action: {action}{_NEWLINE}' if action else ''}"
+            f"{f'- Last error: {error}{_NEWLINE}' if error else ''}"
+            f"{_STATE_PROMPT_FOOTER}"
+        )
     
     def get_email_template(self, meeting_type: str) -> str:
         """Get an email template for a specific meeting type.
@@ -86,28 +114,24 @@ Remember this state while responding to the user. Guide them through any incompl
         Returns:
             An email template string
         """
-        templates = {
-            'recurring': """Subject: Cancellation Notice: {meeting_name}
-
-Hi {attendee_name},
-
-I hope this email finds you well. I wanted to let you know that I'll be taking some time off from {time_off_start} to {time_off_end}, and as a result, our recurring meeting "{meeting_name}" will be cancelled during this period.
-
-We can resume our regular schedule when I return.
-
-Best regards,
-{user_name}""",
+        return _EMAIL_TEMPLATES.get(meeting_type, "") 
+    
+    def render_email_template(self, meeting_type: str, **values) -> str:
+        """Fill in the email template for a meeting type.
+        
+        Equivalent to get_email_template(meeting_type).format(**values).
+        
+        Args:
+            meeting_type: Type of meeting ('recurring' or 'one_off')
+            **values: Values for the template's fields
             
-            'one_off': """Subject: Unable to Attend: {meeting_name}
-
-Hi {attendee_name},
-
-I hope you're doing well. I wanted to let you know that I'll be unavailable for our scheduled meeting "{meeting_name}" on {meeting_date} as I will be taking some time off.
-
-Would it be possible to reschedule this meeting for after my return on {time_off_end}?
+        Returns:
+            The filled-in email, or an empty string for an unknown type
+        """
+        return "".join(
+            literal + (format(values[field], spec) if field else "")
+            for literal, field, spec in _PARSED_EMAIL_TEMPLATES.get(meeting_type, ())
+        )
 
-Best regards,
-{user_name}"""
-        }
-        
-        return templates.get(meeting_type, "") 
\ No newline at end of file
+# Shared instance; PromptTemplates holds no per-conversation state
+TEMPLATES = PromptTemplates()
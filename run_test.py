@@ -1,38 +1,44 @@
 import os
 import sys
-from meeting_rescheduler.calendar_tool import CalendarTool
+import logging
+from logging.handlers import MemoryHandler
 from dotenv import load_dotenv
 
-# Redirect output to a file
-with open('test_output.log', 'w') as f:
-    def log(msg):
-        f.write(msg + '\n')
-        f.flush()
+# Write output to a file, buffered and flushed in batches, on errors and at exit
+file_handler = logging.FileHandler('test_output.log', mode='w')
+file_handler.setFormatter(logging.Formatter('%(message)s'))
+logger = logging.getLogger('run_test')
+logger.setLevel(logging.INFO)
+logger.addHandler(MemoryHandler(capacity=100, flushLevel=logging.ERROR, target=file_handler))
+
+logger.info("Starting test script...")
+logger.info(f"Current directory: {os.getcwd()}")
+
+# Load environment variables
+load_dotenv()
+logger.info("Environment variables loaded")
+
+try:
+    logger.info(f"credentials.json exists: {os.path.exists('credentials.json')}")
+    assert os.path.exists('credentials.json'), "credentials.json not found"
     
-    log("Starting test script...")
-    log(f"Current directory: {os.getcwd()}")
+    # Imported after the credentials check so a missing file fails fast,
+    # before the Google client libraries are loaded
+    from meeting_rescheduler.calendar_service import CalendarService
     
-    # Load environment variables
-    load_dotenv()
-    log("Environment variables loaded")
+    # Create calendar tool
+    logger.info("Creating calendar service...")
+    tool = CalendarService(connect=False)
+    logger.info("Calendar service created")
     
-    try:
-        # Create calendar tool
-        log("Creating calendar tool...")
-        tool = CalendarTool()
-        log("Calendar tool created")
-        
-        # Test authentication
-        log("Testing calendar authentication...")
-        log(f"credentials.json exists: {os.path.exists('credentials.json')}")
-        assert os.path.exists('credentials.json'), "credentials.json not found"
-        
-        success = tool.authenticate()
-        log(f"Authentication result: {success}")
-        assert success, "Calendar authentication failed"
-        assert tool.calendar_service is not None, "Calendar service is None"
-        assert tool.gmail_service is not None, "Gmail service is None"
-        log("Calendar authentication test completed successfully")
-    except Exception as e:
-        log(f"Error occurred: {str(e)}")
-        sys.exit(1) 
\ No newline at end of file
+    # Test authentication
+    logger.info("Testing calendar authentication...")
+    success = tool.authenticate()
+    logger.info(f"Authentication result: {success}")
+    assert success, "Calendar authentication failed"
+    assert tool.service is not None, "Calendar service is None"
+    assert tool.gmail_service is not None, "Gmail service is None"
+    logger.info("Calendar authentication test completed successfully")
+except Exception as e:
+    logger.error(f"Error occurred: {str(e)}")
+    sys.exit(1) 
\ No newline at end of file
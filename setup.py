@@ -12,7 +12,8 @@ setup(
         "google-api-python-client>=2.120.0",
         "python-dotenv>=1.0.1",
         "pytest>=8.0.2",
-        "pytest-asyncio>=0.23.5",
+        "pytest-asyncio>=0.24.0",
+        "pytest-xdist>=3.5.0",
     ],
     python_requires=">=3.11",
 ) 
\ No newline at end of file
@@ -4,7 +4,6 @@ Test script to run the Meeting Rescheduler chatbot locally.
 
 import os
 from dotenv import load_dotenv
-from src.chatbot import create_chatbot
 
 def main():
     # Load environment variables from .env file
@@ -17,6 +16,9 @@ def main():
             "OpenAI API key not found. Please create a .env file with your OPENAI_API_KEY"
         )
     
+    # Imported here so a missing key fails before gradio and openai are loaded
+    from src.chatbot import create_chatbot
+    
     # Create and launch the chatbot interface
     interface = create_chatbot(openai_api_key=api_key)
     
@@ -1,22 +1,40 @@
 import os
+import time
 from datetime import datetime, timedelta
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from typing import Dict, List, Any
 
+# Credentials and Calendar client shared by every SimpleCalendarTool
+_CREDS_CACHE = None
+_CALENDAR_CACHE = None
+
 class SimpleCalendarTool:
     """A simplified version of the calendar tool for testing."""
     
     SCOPES = ['https://www.googleapis.com/auth/calendar']
+    # Only the Event fields this script reads
+    EVENT_LIST_FIELDS = 'items(id,summary,start,end,recurrence,attendees,organizer)'
+    # Seconds a fetched event list is reused for the same range
+    EVENTS_TTL = 60
+    HTTP_TIMEOUT = 30
+    NUM_RETRIES = 3
     
     def __init__(self):
         self.creds = None
         self.calendar_service = None
+        # (calendarId, timeMin, timeMax) -> (expiry, events)
+        self._events_cache: Dict[tuple, tuple] = {}
         
     def authenticate(self) -> bool:
-        if os.path.exists('token.json'):
+        global _CREDS_CACHE, _CALENDAR_CACHE
+        
+        self.creds = _CREDS_CACHE
+        if not self.creds and os.path.exists('token.json'):
             self.creds = Credentials.from_authorized_user_file('token.json', self.SCOPES)
             
         if not self.creds or not self.creds.valid:
@@ -30,40 +48,47 @@ class SimpleCalendarTool:
             with open('token.json', 'w') as token:
                 token.write(self.creds.to_json())
         
-        try:
-            self.calendar_service = build('calendar', 'v3', credentials=self.creds)
+        if self.creds is _CREDS_CACHE and _CALENDAR_CACHE is not None:
+            self.calendar_service = _CALENDAR_CACHE
             return True
+        
+        try:
+            # One authorized connection for every request, built from the
+            # discovery document bundled with the client library
+            http = AuthorizedHttp(self.creds, http=httplib2.Http(timeout=self.HTTP_TIMEOUT))
+            self.calendar_service = build('calendar', 'v3', http=http,
+                                          static_discovery=True, cache_discovery=False)
         except Exception as e:
             print(f"Error building services: {e}")
             return False
+        _CREDS_CACHE, _CALENDAR_CACHE = self.creds, self.calendar_service
+        return True
     
     def get_events(self, start_date: datetime, end_date: datetime) -> Dict[str, List[Dict[str, Any]]]:
         if not self.calendar_service:
             raise ValueError("Calendar service not initialized. Call authenticate() first.")
             
-        events_result = self.calendar_service.events().list(
-            calendarId='primary',
-            timeMin=start_date.isoformat() + 'Z',
-            timeMax=end_date.isoformat() + 'Z',
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
+        key = ('primary', start_date.isoformat() + 'Z', end_date.isoformat() + 'Z')
+        cached = self._events_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            events = cached[1]
+        else:
+            events_result = self.calendar_service.events().list(
+                calendarId=key[0],
+                timeMin=key[1],
+                timeMax=key[2],
+                singleEvents=True,
+                orderBy='startTime',
+                fields=self.EVENT_LIST_FIELDS
+            ).execute(num_retries=self.NUM_RETRIES)
+            
+            events = events_result.get('items', [])
+            self._events_cache[key] = (time.monotonic() + self.EVENTS_TTL, events)
         
         # Classify events
-        recurring_events = []
-        one_off_events = []
-        
-        for event in events:
-            if 'recurrence' in event:
-                recurring_events.append(event)
-            else:
-                one_off_events.append(event)
-                
         return {
-            'recurring': recurring_events,
-            'one_off': one_off_events
+            'recurring': [event for event in events if 'recurrence' in event],
+            'one_off': [event for event in events if 'recurrence' not in event]
         }
 
 def test_calendar_reading():
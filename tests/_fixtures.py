@@ -0,0 +1,50 @@
+"""
+Read-only payloads and helpers shared by the Meeting Rescheduler tests.
+"""
+
+# A recurring series and a one-off meeting, as returned by events().list()
+MOCK_EVENTS = (
+    {
+        'id': 'recurring123',
+        'summary': 'Recurring Meeting',
+        'start': {'dateTime': '2024-05-06T10:00:00Z'},
+        'end': {'dateTime': '2024-05-06T11:00:00Z'},
+        'recurrence': ['RRULE:FREQ=WEEKLY'],
+        'attendees': [{'email': 'test@example.com'}],
+        'organizer': {'email': 'organizer@example.com'}
+    },
+    {
+        'id': 'oneoff456',
+        'summary': 'One-off Meeting',
+        'start': {'dateTime': '2024-05-07T14:00:00Z'},
+        'end': {'dateTime': '2024-05-07T15:00:00Z'},
+        'attendees': [
+            {'email': 'attendee1@example.com'},
+            {'email': 'attendee2@example.com'}
+        ],
+        'organizer': {'email': 'organizer@example.com'}
+    }
+)
+
+# Two instances of the recurring series, as returned by events().instances()
+MOCK_INSTANCES = {
+    'items': (
+        {
+            'id': 'instance1',
+            'summary': 'Recurring Meeting',
+            'start': {'dateTime': '2024-05-06T10:00:00Z'},
+            'end': {'dateTime': '2024-05-06T11:00:00Z'},
+        },
+        {
+            'id': 'instance2',
+            'summary': 'Recurring Meeting',
+            'start': {'dateTime': '2024-05-13T10:00:00Z'},
+            'end': {'dateTime': '2024-05-13T11:00:00Z'},
+        }
+    )
+}
+
+def assert_all_in(response, *substrings):
+    """Assert that every substring appears in the response, reporting all that are missing."""
+    missing = [substring for substring in substrings if substring not in response]
+    assert not missing, f"missing: {missing}"
@@ -0,0 +1,17 @@
+"""
+Shared pytest configuration for the Meeting Rescheduler tests.
+"""
+
+import pytest
+from pytest_asyncio import is_async_test
+
+def pytest_collection_modifyitems(items):
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        # Run every async test on one session-wide event loop
+        if is_async_test(item):
+            item.add_marker(session_loop, append=False)
+        # The integration tests share Google credentials and rewrite token.json,
+        # so keep them on one xdist worker
+        if item.module.__name__.endswith("test_calendar_integration"):
+            item.add_marker(pytest.mark.xdist_group("google"))
@@ -1,293 +1,432 @@
-import unittest
+import base64
+import copy
+import email
+import pytest
 from datetime import datetime, timedelta, timezone
-from unittest.mock import MagicMock, patch
-from src.calendar_service import CalendarService
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from meeting_rescheduler.calendar_service import (
+    CalendarService, EVENT_LIST_FIELDS, EVENT_DETAIL_FIELDS, SERIES_FIELDS, INSTANCE_ID_FIELDS
+)
+from tests._fixtures import MOCK_EVENTS, MOCK_INSTANCES, assert_all_in
 
-class TestCalendarService(unittest.TestCase):
-    def setUp(self):
-        self.mock_events = [
+def _build_calendar_mock(*pages):
+    """Build a fake Calendar service whose events().list() requests return the given pages in turn.
+
+    Only the list call is a mock, so its call arguments can be checked.
+    """
+    responses = iter(pages)
+    request = SimpleNamespace(execute=lambda: next(responses))
+    events = SimpleNamespace(list=Mock(return_value=request))
+    return SimpleNamespace(events=lambda: events)
+
+class _FakeRequest:
+    """A prepared API request whose execute() returns a fixed payload."""
+    def __init__(self, payload):
+        self._payload = payload
+
+    def execute(self, **kwargs):
+        return self._payload
+
+class _FakeEvents:
+    """An events() collection with fixed get and instances payloads.
+
+    get, instances and patch are mocks so their call arguments can be checked.
+    """
+    def __init__(self, get_payload, instances_payload):
+        self.get = Mock(return_value=_FakeRequest(get_payload))
+        self.instances = Mock(return_value=_FakeRequest(instances_payload))
+        self.patch = Mock(return_value=_FakeRequest({}))
+
+# Every test runs against mocked Google authentication and API clients
+@pytest.fixture
+def mock_auth():
+    with patch('meeting_rescheduler.calendar_service.authenticate') as mock:
+        yield mock
+
+@pytest.fixture
+def services():
+    """Mock services by API name; any API not listed gets patched_build.return_value."""
+    return {}
+
+@pytest.fixture
+def patched_build(mock_auth, services):
+    with patch('meeting_rescheduler.calendar_service.build_service') as mock:
+        mock.side_effect = lambda service_name, version, credentials: services.get(service_name) or mock.return_value
+        yield mock
+
+@pytest.fixture
+def instances_factory():
+    """Build an events().instances() payload with n weekly instances of the recurring series."""
+    base = datetime(2024, 5, 6, 10)
+    def make(n):
+        return {'items': [
             {
-                'id': 'recurring123',
+                'id': f'instance{i}',
                 'summary': 'Recurring Meeting',
-                'start': {'dateTime': '2024-05-06T10:00:00Z'},
-                'end': {'dateTime': '2024-05-06T11:00:00Z'},
-                'recurrence': ['RRULE:FREQ=WEEKLY'],
-                'attendees': [{'email': 'test@example.com'}],
-                'organizer': {'email': 'organizer@example.com'}
-            },
-            {
-                'id': 'oneoff456',
-                'summary': 'One-off Meeting',
-                'start': {'dateTime': '2024-05-07T14:00:00Z'},
-                'end': {'dateTime': '2024-05-07T15:00:00Z'},
-                'attendees': [
-                    {'email': 'attendee1@example.com'},
-                    {'email': 'attendee2@example.com'}
-                ],
-                'organizer': {'email': 'organizer@example.com'}
+                'start': {'dateTime': (base + timedelta(weeks=i)).strftime('%Y-%m-%dT%H:%M:%SZ')},
+                'end': {'dateTime': (base + timedelta(weeks=i, hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')},
             }
-        ]
-        
-        self.mock_instances = {
-            'items': [
-                {
-                    'id': 'instance1',
-                    'summary': 'Recurring Meeting',
-                    'start': {'dateTime': '2024-05-06T10:00:00Z'},
-                    'end': {'dateTime': '2024-05-06T11:00:00Z'},
-                },
-                {
-                    'id': 'instance2',
-                    'summary': 'Recurring Meeting',
-                    'start': {'dateTime': '2024-05-13T10:00:00Z'},
-                    'end': {'dateTime': '2024-05-13T11:00:00Z'},
-                }
-            ]
-        }
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_get_events(self, mock_build, mock_auth):
-        # Setup mock calendar service
-        mock_service = MagicMock()
-        mock_events_obj = MagicMock()
-        mock_events_obj.list().execute.return_value = {'items': self.mock_events}
-        mock_service.events.return_value = mock_events_obj
-        mock_build.return_value = mock_service
-
-        # Create calendar service and get events
-        calendar = CalendarService()
-        start_date = datetime(2024, 5, 6)
-        end_date = datetime(2024, 5, 7)
-        events = calendar.get_events(start_date, end_date)
-
-        # Verify results
-        self.assertEqual(len(events), 2)
-        self.assertEqual(events[0]['summary'], 'Recurring Meeting')
-        self.assertEqual(events[1]['summary'], 'One-off Meeting')
-
-    def test_classify_events(self):
-        calendar = CalendarService()
-        classified = calendar.classify_events(self.mock_events)
-
-        # Verify classification
-        self.assertEqual(len(classified['recurring']), 1)
-        self.assertEqual(len(classified['one_off']), 1)
-        self.assertEqual(classified['recurring'][0]['summary'], 'Recurring Meeting')
-        self.assertEqual(classified['one_off'][0]['summary'], 'One-off Meeting')
-
-    def test_format_event_info(self):
-        calendar = CalendarService()
-        event_info = calendar.format_event_info(self.mock_events[0])
-
-        # Verify formatting
-        self.assertIn('Recurring Meeting', event_info)
-        self.assertIn('test@example.com', event_info)
-        self.assertIn('Recurring: Yes', event_info)
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_cancel_recurring_meetings(self, mock_build, mock_auth):
-        # Setup mock calendar service
-        mock_service = MagicMock()
-        mock_service.events().get().execute.return_value = self.mock_events[0]
-        mock_service.events().instances().execute.return_value = self.mock_instances
-        mock_service.events().update().execute.return_value = {}
-        mock_build.return_value = mock_service
-
-        # Create calendar service and cancel recurring meetings
-        calendar = CalendarService()
-        start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
-        end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
-        
-        success, message = calendar.cancel_recurring_meetings('recurring123', start_date, end_date)
-        
-        # Verify results
-        self.assertTrue(success)
-        self.assertIn('Successfully cancelled 2 instances', message)
-        
-        # Verify the service calls
-        mock_service.events().get.assert_called_with(calendarId='primary', eventId='recurring123')
-        mock_service.events().instances.assert_called_with(
-            calendarId='primary',
-            eventId='recurring123',
-            timeMin=start_date.isoformat() + 'Z',
-            timeMax=end_date.isoformat() + 'Z'
-        )
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_send_cancellation_notifications(self, mock_build, mock_auth):
-        # Setup mock services
-        mock_gmail_service = MagicMock()
-        mock_gmail_service.users().messages().send().execute.return_value = {}
-        
-        # Configure the build function to return different services
-        def mock_build_service(service_name, version, credentials):
-            if service_name == 'gmail':
-                return mock_gmail_service
-            return MagicMock()
-        
-        mock_build.side_effect = mock_build_service
-
-        # Create calendar service and send notifications
-        calendar = CalendarService()
-        start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
-        end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
-        
-        success, message = calendar.send_cancellation_notifications(self.mock_events[0], start_date, end_date)
-        
-        # Verify results
-        self.assertTrue(success)
-        self.assertIn('Successfully sent cancellation notifications to 1 attendees', message)
-        
-        # Verify the Gmail API was called
-        self.assertTrue(mock_gmail_service.users().messages().send.called)
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_cancel_recurring_meeting_with_notifications(self, mock_build, mock_auth):
-        # Setup mock services
-        mock_calendar_service = MagicMock()
-        mock_gmail_service = MagicMock()
-        
-        # Configure calendar service mocks
-        mock_calendar_service.events().get().execute.return_value = self.mock_events[0]
-        mock_calendar_service.events().instances().execute.return_value = self.mock_instances
-        mock_calendar_service.events().update().execute.return_value = {}
-        
-        # Configure Gmail service mocks
-        mock_gmail_service.users().messages().send().execute.return_value = {}
-        
-        # Configure the build function to return different services
-        def mock_build_service(service_name, version, credentials):
-            if service_name == 'gmail':
-                return mock_gmail_service
-            return mock_calendar_service
-        
-        mock_build.side_effect = mock_build_service
-
-        # Create calendar service and perform the combined operation
-        calendar = CalendarService()
-        start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
-        end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
-        
-        results = calendar.cancel_recurring_meeting_with_notifications(
-            'recurring123',
-            start_date,
-            end_date
-        )
-        
-        # Verify results
-        self.assertIn('Successfully cancelled 2 instances', results['cancellation'])
-        self.assertIn('Successfully sent cancellation notifications', results['notifications'])
-        
-        # Verify both services were called
-        mock_calendar_service.events().get.assert_called_with(calendarId='primary', eventId='recurring123')
-        self.assertTrue(mock_gmail_service.users().messages().send.called)
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_get_one_off_meetings(self, mock_build, mock_auth):
-        # Setup mock calendar service
-        mock_service = MagicMock()
-        mock_events_obj = MagicMock()
-        mock_events_obj.list().execute.return_value = {'items': self.mock_events}
-        mock_service.events.return_value = mock_events_obj
-        mock_build.return_value = mock_service
-
-        # Create calendar service and get one-off meetings
-        calendar = CalendarService()
-        start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
-        end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
-        
-        one_off_meetings = calendar.get_one_off_meetings(start_date, end_date)
-        
-        # Verify results
-        self.assertEqual(len(one_off_meetings), 1)
-        self.assertEqual(one_off_meetings[0]['summary'], 'One-off Meeting')
-        self.assertNotIn('recurrence', one_off_meetings[0])
-
-    def test_generate_rescheduling_template(self):
-        calendar = CalendarService()
-        template = calendar.generate_rescheduling_template(self.mock_events[1])
-        
-        # Verify template content
-        self.assertIn('One-off Meeting', template)
-        self.assertIn('May 07', template)
-        self.assertIn('attendee1@example.com', template)
-        self.assertIn('attendee2@example.com', template)
-        self.assertIn('organizer@example.com', template)
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_send_rescheduling_email(self, mock_build, mock_auth):
-        # Setup mock services
-        mock_gmail_service = MagicMock()
-        mock_gmail_service.users().messages().send().execute.return_value = {}
-        
-        # Setup mock user info service
-        mock_user_info_service = MagicMock()
-        mock_user_info_service.userinfo().get().execute.return_value = {
-            'email': 'me@example.com'
-        }
-        
-        # Configure the build function to return different services
-        def mock_build_service(service_name, version, credentials):
-            if service_name == 'gmail':
-                return mock_gmail_service
-            elif service_name == 'oauth2':
-                return mock_user_info_service
-            return MagicMock()
-        
-        mock_build.side_effect = mock_build_service
-
-        # Create calendar service and send rescheduling email
-        calendar = CalendarService()
-        custom_message = "Custom rescheduling message"
-        success, message = calendar.send_rescheduling_email(self.mock_events[1], custom_message)
-        
-        # Verify results
-        self.assertTrue(success)
-        self.assertIn('Successfully sent rescheduling email', message)
-        self.assertTrue(mock_gmail_service.users().messages().send.called)
-
-    @patch('src.calendar_service.authenticate')
-    @patch('src.calendar_service.build')
-    def test_handle_one_off_meeting(self, mock_build, mock_auth):
-        # Setup mock services
-        mock_gmail_service = MagicMock()
-        mock_gmail_service.users().messages().send().execute.return_value = {}
-        
-        mock_user_info_service = MagicMock()
-        mock_user_info_service.userinfo().get().execute.return_value = {
-            'email': 'me@example.com'
-        }
-        
-        def mock_build_service(service_name, version, credentials):
-            if service_name == 'gmail':
-                return mock_gmail_service
-            elif service_name == 'oauth2':
-                return mock_user_info_service
-            return MagicMock()
-        
-        mock_build.side_effect = mock_build_service
-
-        # Create calendar service and handle one-off meeting
-        calendar = CalendarService()
-        
-        # Test without sending email (custom_message = None)
-        results = calendar.handle_one_off_meeting(self.mock_events[1])
-        self.assertIn('meeting_info', results)
-        self.assertIn('template', results)
-        self.assertNotIn('email_status', results)
-        
-        # Test with custom message
-        results = calendar.handle_one_off_meeting(self.mock_events[1], "Custom message")
-        self.assertIn('meeting_info', results)
-        self.assertIn('template', results)
-        self.assertIn('email_status', results)
-        self.assertIn('Successfully sent', results['email_status'])
-
-if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+            for i in range(n)
+        ]}
+    return make
+
+def test_get_events(patched_build):
+    # Setup mock calendar service
+    mock_service = _build_calendar_mock({'items': MOCK_EVENTS})
+    mock_events_obj = mock_service.events()
+    patched_build.return_value = mock_service
+
+    # Create calendar service and get events
+    calendar = CalendarService()
+    start_date = datetime(2024, 5, 6)
+    end_date = datetime(2024, 5, 7)
+    events = calendar.get_events(start_date, end_date)
+
+    # Verify results
+    assert len(events) == 2
+    assert events[0]['summary'] == 'Recurring Meeting'
+    assert events[1]['summary'] == 'One-off Meeting'
+    assert mock_events_obj.list.call_args.kwargs['fields'] == EVENT_LIST_FIELDS
+
+
+def test_get_events_follows_pages(patched_build):
+    # Setup mock calendar service returning two pages
+    mock_service = _build_calendar_mock(
+        {'items': MOCK_EVENTS[:1], 'nextPageToken': 'page2'},
+        {'items': MOCK_EVENTS[1:]}
+    )
+    mock_events_obj = mock_service.events()
+    patched_build.return_value = mock_service
+
+    calendar = CalendarService()
+    events = calendar.get_events(datetime(2024, 5, 6), datetime(2024, 5, 7))
+
+    # Verify both pages were fetched
+    assert [event['summary'] for event in events] == ['Recurring Meeting', 'One-off Meeting']
+    assert mock_events_obj.list.call_args.kwargs['pageToken'] == 'page2'
+
+
+def test_get_events_details(patched_build):
+    # Setup mock calendar service whose batch answers every lookup but the last
+    mock_service = Mock()
+    mock_batch = Mock()
+    mock_service.new_batch_http_request.return_value = mock_batch
+    patched_build.return_value = mock_service
+
+    def execute():
+        callback = mock_service.new_batch_http_request.call_args.kwargs['callback']
+        callback('0', MOCK_EVENTS[0], None)
+        callback('1', None, Exception('Not Found'))
+    mock_batch.execute.side_effect = execute
+
+    calendar = CalendarService()
+    details = calendar.get_events_details(['recurring123', 'missing'])
+
+    # Verify both lookups went out in one batch, in order
+    assert details == [MOCK_EVENTS[0], None]
+    assert mock_batch.add.call_count == 2
+    mock_batch.execute.assert_called_once()
+    mock_service.events().get.assert_called_with(
+        calendarId='primary', eventId='missing', fields=EVENT_DETAIL_FIELDS
+    )
+
+
+def test_classify_events(patched_build):
+    calendar = CalendarService()
+    classified = calendar.classify_events(MOCK_EVENTS)
+
+    # Verify classification
+    assert len(classified['recurring']) == 1
+    assert len(classified['one_off']) == 1
+    assert classified['recurring'][0]['summary'] == 'Recurring Meeting'
+    assert classified['one_off'][0]['summary'] == 'One-off Meeting'
+
+
+def test_format_event_info(patched_build):
+    calendar = CalendarService()
+    event = copy.deepcopy(MOCK_EVENTS[0])
+    event_info = calendar.format_event_info(event)
+
+    # Verify formatting
+    assert_all_in(
+        event_info,
+        'Recurring Meeting',
+        'test@example.com',
+        'Recurring: Yes'
+    )
+    # The API payload is left as returned
+    assert event == MOCK_EVENTS[0]
+
+
+def test_cancel_recurring_meetings(patched_build):
+    # Setup mock calendar service
+    mock_service = Mock()
+    mock_service.events.return_value = _FakeEvents(MOCK_EVENTS[0], MOCK_INSTANCES)
+    patched_build.return_value = mock_service
+
+    # Create calendar service and cancel recurring meetings
+    calendar = CalendarService()
+    start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
+    end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
+    
+    success, message = calendar.cancel_recurring_meetings('recurring123', start_date, end_date)
+    
+    # Verify results
+    assert success
+    assert 'Successfully cancelled 2 instances' in message
+    
+    # Verify the service calls
+    mock_service.events().get.assert_called_with(
+        calendarId='primary',
+        eventId='recurring123',
+        fields=SERIES_FIELDS
+    )
+    mock_service.events().instances.assert_called_with(
+        calendarId='primary',
+        eventId='recurring123',
+        timeMin=start_date.isoformat() + 'Z',
+        timeMax=end_date.isoformat() + 'Z',
+        pageToken=None,
+        fields=INSTANCE_ID_FIELDS
+    )
+    mock_service.events().patch.assert_called_with(
+        calendarId='primary',
+        eventId='instance2',
+        body={'status': 'cancelled'}
+    )
+    mock_service.new_batch_http_request().execute.assert_called_once()
+
+
+def test_cancel_recurring_meetings_follows_pages(patched_build, instances_factory):
+    # Setup mock calendar service returning the instances over two pages
+    items = instances_factory(3)['items']
+    events = _FakeEvents(MOCK_EVENTS[0], None)
+    events.instances = Mock(side_effect=[
+        _FakeRequest({'items': items[:2], 'nextPageToken': 'page2'}),
+        _FakeRequest({'items': items[2:]})
+    ])
+    mock_service = Mock()
+    mock_service.events.return_value = events
+    patched_build.return_value = mock_service
+
+    calendar = CalendarService()
+    success, message = calendar.cancel_recurring_meetings(
+        'recurring123',
+        datetime(2024, 5, 6, tzinfo=timezone.utc),
+        datetime(2024, 5, 27, tzinfo=timezone.utc)
+    )
+
+    # Verify every page was fetched and cancelled
+    assert success
+    assert 'Successfully cancelled 3 instances' in message
+    assert events.instances.call_args.kwargs['pageToken'] == 'page2'
+    assert events.patch.call_count == 3
+
+@pytest.mark.parametrize("n", [2, 100, 1000])
+def test_cancel_recurring_meetings_scales(patched_build, instances_factory, n):
+    # Setup mock calendar service with n instances in the range
+    mock_service = Mock()
+    mock_service.events.return_value = _FakeEvents(MOCK_EVENTS[0], instances_factory(n))
+    patched_build.return_value = mock_service
+
+    calendar = CalendarService()
+    success, message = calendar.cancel_recurring_meetings(
+        'recurring123',
+        datetime(2024, 5, 6, tzinfo=timezone.utc),
+        datetime(2024, 5, 6, tzinfo=timezone.utc) + timedelta(weeks=n)
+    )
+
+    # Verify one update per instance, sent BATCH_SIZE per round-trip
+    assert success
+    assert f'Successfully cancelled {n} instances' in message
+    assert mock_service.events().patch.call_count == n
+    batch = mock_service.new_batch_http_request()
+    assert batch.add.call_count == n
+    assert batch.execute.call_count == -(-n // CalendarService.BATCH_SIZE)
+
+
+def test_send_cancellation_notifications(patched_build, services):
+    # Setup mock services
+    mock_gmail_service = Mock()
+    send_mock = mock_gmail_service.users.return_value.messages.return_value.send
+    send_mock.return_value.execute.return_value = {}
+    
+    mock_user_info_service = Mock()
+    mock_user_info_service.userinfo().get().execute.return_value = {
+        'email': 'me@example.com'
+    }
+    
+    # Route each API to its mock service
+    services.update(gmail=mock_gmail_service, oauth2=mock_user_info_service)
+
+    # Create calendar service and send notifications
+    calendar = CalendarService()
+    start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
+    end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
+    
+    success, message = calendar.send_cancellation_notifications(MOCK_EVENTS[0], start_date, end_date)
+    
+    # Verify results
+    assert success
+    assert 'Successfully sent cancellation notifications to 1 attendees' in message
+    
+    # Verify the Gmail API was called, with the attendees blind-copied
+    assert send_mock.call_count == 1
+    sent = email.message_from_bytes(base64.urlsafe_b64decode(send_mock.call_args.kwargs['body']['raw']))
+    assert sent['to'] == 'me@example.com'
+    assert sent['bcc'] == 'test@example.com'
+
+
+def test_cancel_recurring_meeting_with_notifications(patched_build, services):
+    # Setup mock services
+    mock_calendar_service = Mock()
+    mock_gmail_service = Mock()
+    
+    # Configure calendar service mocks
+    mock_calendar_service.events.return_value = _FakeEvents(MOCK_EVENTS[0], MOCK_INSTANCES)
+    
+    # Configure Gmail service mocks
+    send_mock = mock_gmail_service.users.return_value.messages.return_value.send
+    send_mock.return_value.execute.return_value = {}
+    
+    mock_user_info_service = Mock()
+    mock_user_info_service.userinfo().get().execute.return_value = {
+        'email': 'me@example.com'
+    }
+    
+    # Route each API to its mock service
+    services.update(gmail=mock_gmail_service, calendar=mock_calendar_service, oauth2=mock_user_info_service)
+
+    # Create calendar service and perform the combined operation
+    calendar = CalendarService()
+    start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
+    end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
+    
+    results = calendar.cancel_recurring_meeting_with_notifications(
+        'recurring123',
+        start_date,
+        end_date
+    )
+    
+    # Verify results
+    assert 'Successfully cancelled 2 instances' in results['cancellation']
+    assert 'Successfully sent cancellation notifications' in results['notifications']
+    
+    # Verify both services were called
+    mock_calendar_service.events().get.assert_called_with(
+        calendarId='primary',
+        eventId='recurring123',
+        fields=SERIES_FIELDS
+    )
+    assert send_mock.call_count == 1
+
+
+def test_get_one_off_meetings(patched_build):
+    # Setup mock calendar service
+    mock_service = _build_calendar_mock({'items': MOCK_EVENTS})
+    patched_build.return_value = mock_service
+
+    # Create calendar service and get one-off meetings
+    calendar = CalendarService()
+    start_date = datetime(2024, 5, 6, tzinfo=timezone.utc)
+    end_date = datetime(2024, 5, 20, tzinfo=timezone.utc)
+    
+    one_off_meetings = calendar.get_one_off_meetings(start_date, end_date)
+    
+    # Verify results
+    assert len(one_off_meetings) == 1
+    assert one_off_meetings[0]['summary'] == 'One-off Meeting'
+    assert 'recurrence' not in one_off_meetings[0]
+
+
+def test_generate_rescheduling_template(patched_build):
+    calendar = CalendarService()
+    template = calendar.generate_rescheduling_template(MOCK_EVENTS[1])
+    
+    # Verify template content
+    assert_all_in(
+        template,
+        'One-off Meeting',
+        'May 07',
+        'attendee1@example.com',
+        'attendee2@example.com',
+        'organizer@example.com'
+    )
+
+
+def test_send_rescheduling_email(patched_build, services):
+    # Setup mock services
+    mock_gmail_service = Mock()
+    send_mock = mock_gmail_service.users.return_value.messages.return_value.send
+    send_mock.return_value.execute.return_value = {}
+    
+    # Setup mock user info service
+    mock_user_info_service = Mock()
+    mock_user_info_service.userinfo().get().execute.return_value = {
+        'email': 'me@example.com'
+    }
+    
+    # Route each API to its mock service
+    services.update(gmail=mock_gmail_service, oauth2=mock_user_info_service)
+
+    # Create calendar service and send rescheduling email
+    calendar = CalendarService()
+    custom_message = "Custom rescheduling message"
+    success, message = calendar.send_rescheduling_email(MOCK_EVENTS[1], custom_message)
+    
+    # Verify results
+    assert success
+    assert 'Successfully sent rescheduling email' in message
+    assert send_mock.call_count == 1
+
+
+def test_handle_one_off_meeting(patched_build, services):
+    # Setup mock services
+    mock_gmail_service = Mock()
+    send_mock = mock_gmail_service.users.return_value.messages.return_value.send
+    send_mock.return_value.execute.return_value = {}
+    
+    mock_user_info_service = Mock()
+    mock_user_info_service.userinfo().get().execute.return_value = {
+        'email': 'me@example.com'
+    }
+    
+    # Route each API to its mock service
+    services.update(gmail=mock_gmail_service, oauth2=mock_user_info_service)
+
+    # Create calendar service and handle one-off meeting
+    calendar = CalendarService()
+    
+    # Test without sending email (custom_message = None)
+    results = calendar.handle_one_off_meeting(MOCK_EVENTS[1])
+    assert 'meeting_info' in results
+    assert 'template' in results
+    assert 'email_status' not in results
+    
+    # Test with custom message
+    results = calendar.handle_one_off_meeting(MOCK_EVENTS[1], "Custom message")
+    assert 'meeting_info' in results
+    assert 'template' in results
+    assert 'email_status' in results
+    assert 'Successfully sent' in results['email_status']
+
+    # Only the second call sent an email
+    assert send_mock.call_count == 1
+
+
+def test_get_authenticated_user_email_is_cached(patched_build, services):
+    mock_user_info_service = Mock()
+    mock_user_info_service.userinfo().get().execute.return_value = {
+        'email': 'me@example.com'
+    }
+    
+    # Route each API to its mock service
+    services.update(oauth2=mock_user_info_service)
+
+    calendar = CalendarService()
+    assert calendar.get_authenticated_user_email() == 'me@example.com'
+    assert calendar.get_authenticated_user_email() == 'me@example.com'
+    
+    # The userinfo endpoint is only hit once
+    assert mock_user_info_service.userinfo().get().execute.call_count == 1
@@ -1,185 +1,196 @@
-import unittest
-from datetime import datetime, timedelta, timezone
-from unittest.mock import MagicMock, patch
-from src.chatbot import MeetingReschedulerBot
-
-class TestMeetingReschedulerBot(unittest.TestCase):
-    def setUp(self):
-        self.bot = MeetingReschedulerBot()
-        self.mock_events = [
-            {
-                'id': 'recurring123',
-                'summary': 'Recurring Meeting',
-                'start': {'dateTime': '2024-05-06T10:00:00Z'},
-                'end': {'dateTime': '2024-05-06T11:00:00Z'},
-                'recurrence': ['RRULE:FREQ=WEEKLY'],
-                'attendees': [{'email': 'test@example.com'}],
-                'organizer': {'email': 'organizer@example.com'}
-            },
-            {
-                'id': 'oneoff456',
-                'summary': 'One-off Meeting',
-                'start': {'dateTime': '2024-05-07T14:00:00Z'},
-                'end': {'dateTime': '2024-05-07T15:00:00Z'},
-                'attendees': [
-                    {'email': 'attendee1@example.com'},
-                    {'email': 'attendee2@example.com'}
-                ],
-                'organizer': {'email': 'organizer@example.com'}
-            }
-        ]
-
-    @patch('src.chatbot.CalendarService')
-    def test_initialize_calendar_service(self, mock_calendar_service):
-        # Test successful initialization
-        response, state = self.bot.initialize_calendar_service()
-        self.assertTrue(state['authenticated'])
-        self.assertIn("Successfully authenticated", response)
-        self.assertIn("YYYY-MM-DD to YYYY-MM-DD", response)
-
-        # Test failed initialization
-        mock_calendar_service.side_effect = Exception("Auth failed")
-        bot = MeetingReschedulerBot()
-        response, state = bot.initialize_calendar_service()
-        self.assertFalse(state['authenticated'])
-        self.assertIn("Authentication failed", response)
-
-    def test_parse_date_range(self):
-        # Test valid date range
-        start_date, end_date = self.bot.parse_date_range("2024-05-01 to 2024-05-10")
-        self.assertEqual(start_date.year, 2024)
-        self.assertEqual(start_date.month, 5)
-        self.assertEqual(start_date.day, 1)
-        self.assertEqual(end_date.year, 2024)
-        self.assertEqual(end_date.month, 5)
-        self.assertEqual(end_date.day, 10)
-
-        # Test invalid date range
-        start_date, end_date = self.bot.parse_date_range("invalid date range")
-        self.assertIsNone(start_date)
-        self.assertIsNone(end_date)
-
-    @patch('src.chatbot.CalendarService')
-    def test_process_time_off_dates(self, mock_calendar_service):
-        # Setup mock calendar service
-        mock_instance = mock_calendar_service.return_value
-        mock_instance.get_events.return_value = self.mock_events
-        mock_instance.classify_events.return_value = {
-            'recurring': [self.mock_events[0]],
-            'one_off': [self.mock_events[1]]
-        }
-
-        # Test without authentication
-        response, state = self.bot.process_time_off_dates("2024-05-01 to 2024-05-10")
-        self.assertIn("Please authenticate first", response)
-
-        # Test with authentication
-        self.bot.state['authenticated'] = True
-        response, state = self.bot.process_time_off_dates("2024-05-01 to 2024-05-10")
-        self.assertIn("Found 2 meetings", response)
-        self.assertIn("1 recurring meetings", response)
-        self.assertIn("1 one-off meetings", response)
-
-        # Test invalid date format
-        response, state = self.bot.process_time_off_dates("invalid date range")
-        self.assertIn("Invalid date format", response)
-
-        # Test end date before start date
-        response, state = self.bot.process_time_off_dates("2024-05-10 to 2024-05-01")
-        self.assertIn("End date must be after start date", response)
-
-    @patch('src.chatbot.CalendarService')
-    def test_handle_recurring_meetings(self, mock_calendar_service):
-        # Setup mock calendar service
-        mock_instance = mock_calendar_service.return_value
-        mock_instance.cancel_recurring_meeting_with_notifications.return_value = {
-            'cancellation': 'Successfully cancelled 1 instance',
-            'notifications': 'Successfully sent notifications'
-        }
-
-        # Setup state
-        self.bot.state['authenticated'] = True
-        self.bot.state['recurring_meetings'] = [self.mock_events[0]]
-        self.bot.state['one_off_meetings'] = [self.mock_events[1]]
-        self.bot.calendar_service = mock_instance
-
-        # Test invalid input
-        response, state = self.bot.handle_recurring_meetings("maybe")
-        self.assertIn("Please answer 'yes' or 'no'", response)
-
-        # Test declining cancellation
-        response, state = self.bot.handle_recurring_meetings("no")
-        self.assertIn("Would you like to review the one-off meetings?", response)
-
-        # Test accepting cancellation
-        response, state = self.bot.handle_recurring_meetings("yes")
-        self.assertIn("Recurring meetings handled", response)
-        self.assertIn("Successfully cancelled 1 instance", response)
-        self.assertIn("Successfully sent notifications", response)
-
-    @patch('src.chatbot.CalendarService')
-    def test_handle_one_off_meetings(self, mock_calendar_service):
-        # Setup mock calendar service
-        mock_instance = mock_calendar_service.return_value
-        mock_instance.format_event_info.return_value = "Meeting details"
-        mock_instance.generate_rescheduling_template.return_value = "Email template"
-        mock_instance.handle_one_off_meeting.return_value = {
-            'meeting_info': 'Meeting details',
-            'template': 'Email template',
-            'email_status': 'Successfully sent'
-        }
-
-        # Setup state
-        self.bot.state['authenticated'] = True
-        self.bot.state['one_off_meetings'] = [self.mock_events[1]]
-        self.bot.calendar_service = mock_instance
-
-        # Test initial prompt
-        response, state = self.bot.handle_one_off_meetings("yes")
-        self.assertIn("Let's review the one-off meetings", response)
-        self.assertIn("Meeting details", response)
-        self.assertIn("Email template", response)
-
-        # Test sending email
-        response, state = self.bot.handle_one_off_meetings("send")
-        self.assertIn("Email sent successfully", response)
-        self.assertIn("All meetings have been handled", response)
-
-        # Test skipping meeting
-        self.bot.state['current_meeting_index'] = 0
-        response, state = self.bot.handle_one_off_meetings("skip")
-        self.assertIn("Meeting skipped", response)
-
-        # Test editing template
-        self.bot.state['current_meeting_index'] = 0
-        response, state = self.bot.handle_one_off_meetings("edit")
-        self.assertIn("Please enter your customized email message", response)
-
-        # Test custom template
-        response, state = self.bot.handle_one_off_meetings("Custom email content")
-        self.assertIn("Email template updated", response)
-
-    @patch('src.chatbot.CalendarService')
-    def test_chat(self, mock_calendar_service):
-        # Test initial authentication
-        response, state = self.bot.chat("", [], None)
-        self.assertIn("Successfully authenticated", response)
-
-        # Test date processing
-        self.bot.state['authenticated'] = True
-        response, state = self.bot.chat("2024-05-01 to 2024-05-10", [], self.bot.state)
-        self.assertIn("Found", response)
-
-        # Test recurring meetings
-        self.bot.state['recurring_meetings'] = [self.mock_events[0]]
-        response, state = self.bot.chat("yes", [], self.bot.state)
-        self.assertIn("Recurring meetings handled", response)
-
-        # Test one-off meetings
-        self.bot.state['one_off_meetings'] = [self.mock_events[1]]
-        self.bot.state['current_meeting_index'] = 0
-        response, state = self.bot.chat("yes", [], self.bot.state)
-        self.assertIn("Let's review the one-off meetings", response)
-
-if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from meeting_rescheduler.chatbot import MeetingReschedulerBot
+from meeting_rescheduler.calendar_service import CalendarService
+from tests._fixtures import MOCK_EVENTS
+
+# Time off shared by the calendar action tests
+_TIME_OFF = {'time_off_start': datetime(2024, 5, 6), 'time_off_end': datetime(2024, 5, 7)}
+
+@pytest.fixture
+def mock_calendar_service():
+    with patch('meeting_rescheduler.chatbot.CalendarService', autospec=True) as mock:
+        mock.return_value.get_authenticated_user_email.return_value = 'me@example.com'
+        yield mock
+
+@pytest.fixture
+def bot(mock_calendar_service):
+    """A bot with a connected, mocked calendar."""
+    bot = MeetingReschedulerBot(openai_api_key='test-key')
+    bot.calendar_service = mock_calendar_service.return_value
+    bot.conversation.state_manager.update_state(authenticated=True, **_TIME_OFF)
+    return bot
+
+def _stub_reply(bot, *partials, **state):
+    """Make the bot's next LLM turn stream the partials, then update the state."""
+    async def stream_response(message):
+        bot.conversation.add_message(message, is_human=True)
+        for partial in partials:
+            yield partial
+        bot.conversation.add_message(partials[-1], is_human=False)
+        bot.conversation.state_manager.update_state(**state)
+    bot.conversation.stream_response = stream_response
+
+async def _chat(bot, message):
+    return [output async for output in bot.chat(message, [])]
+
+def _classified_in_window(start_date, end_date):
+    """Classify the mock events that start in [start_date, end_date), as the API would."""
+    in_window = [
+        event for event in MOCK_EVENTS
+        if start_date <= datetime.fromisoformat(event['start']['dateTime']).replace(tzinfo=None) < end_date
+    ]
+    return CalendarService.classify_events(in_window)
+
+async def test_chat_streams_reply(bot):
+    _stub_reply(bot, "I'll", "I'll help.")
+
+    outputs = await _chat(bot, "Hi")
+
+    assert outputs == [
+        ("", [["Hi", "I'll"]]),
+        ("", [["Hi", "I'll help."]]),
+        ("", [["Hi", "I'll help."]]),
+    ]
+
+async def test_chat_authenticates(mock_calendar_service):
+    bot = MeetingReschedulerBot(openai_api_key='test-key')
+    _stub_reply(bot, "Connecting your calendar.", current_action='authenticate')
+
+    await _chat(bot, "Connect my calendar")
+
+    mock_calendar_service.assert_called_once_with()
+    assert bot.calendar_service is mock_calendar_service.return_value
+    state = bot.conversation.state_manager.get_state()
+    assert state['authenticated']
+    assert state['current_action'] is None
+
+async def test_chat_gets_meetings(bot):
+    bot.calendar_service.aget_classified_events.return_value = {
+        'recurring': [
+            # Two instances of one series
+            {**MOCK_EVENTS[0], 'id': 'instance1', 'recurringEventId': 'recurring123'},
+            {**MOCK_EVENTS[0], 'id': 'instance2', 'recurringEventId': 'recurring123'},
+        ],
+        'one_off': [MOCK_EVENTS[1]]
+    }
+    _stub_reply(bot, "Looking up your meetings.", current_action='get_meetings')
+
+    await _chat(bot, "What meetings do I have?")
+
+    bot.calendar_service.aget_classified_events.assert_awaited_once()
+    state = bot.conversation.state_manager.get_state()
+    # Recurring meetings are stored once per series
+    assert [meeting.event_id for meeting in state['recurring_meetings']] == ['recurring123']
+    assert [meeting.event_id for meeting in state['one_off_meetings']] == ['oneoff456']
+
+async def test_chat_gets_meetings_on_last_day_off(bot):
+    bot.calendar_service.aget_classified_events.side_effect = _classified_in_window
+    _stub_reply(bot, "Looking up your meetings.", current_action='get_meetings')
+
+    await _chat(bot, "What meetings do I have?")
+
+    # The one-off meeting is on the afternoon of the last day off
+    state = bot.conversation.state_manager.get_state()
+    assert [meeting.event_id for meeting in state['one_off_meetings']] == ['oneoff456']
+    assert [meeting.event_id for meeting in state['recurring_meetings']] == ['recurring123']
+
+async def test_chat_cancels_recurring(bot):
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[0], is_recurring=True)
+    bot.calendar_service.acancel_recurring_meetings.return_value = (True, "Successfully cancelled 1 instance")
+    _stub_reply(bot, "Cancelling them now.", current_action='cancel_recurring')
+
+    await _chat(bot, "Yes, cancel them")
+
+    # The time off ends at the end of its last day
+    bot.calendar_service.acancel_recurring_meetings.assert_awaited_once_with(
+        'recurring123', datetime(2024, 5, 6), datetime(2024, 5, 8)
+    )
+    meeting = bot.conversation.state_manager.get_state()['recurring_meetings'][0]
+    assert meeting.status == 'cancelled'
+
+@pytest.mark.parametrize("sent, expected_status", [
+    ((True, "Email sent successfully"), 'notified'),
+    # A failed send leaves the meeting to be retried
+    ((False, "Failed to send email"), 'pending'),
+])
+async def test_chat_sends_emails(bot, sent, expected_status):
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[1], is_recurring=False)
+    bot.calendar_service.asend_rescheduling_email.return_value = sent
+    _stub_reply(bot, "Sending the emails.", current_action='send_emails')
+
+    await _chat(bot, "Send them")
+
+    bot.calendar_service.asend_rescheduling_email.assert_awaited_once()
+    event, body = bot.calendar_service.asend_rescheduling_email.await_args.args
+    assert event['id'] == 'oneoff456'
+    assert event['attendees'] == MOCK_EVENTS[1]['attendees']
+    assert 'One-off Meeting' in body
+    meeting = bot.conversation.state_manager.get_state()['one_off_meetings'][0]
+    assert meeting.status == expected_status
+
+def test_render_email_reuses_renders(bot):
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[1], is_recurring=False)
+    state = bot.conversation.state_manager.get_state()
+    meeting = state['one_off_meetings'][0]
+
+    first = bot._render_email('one_off', meeting, state)
+    second = bot._render_email('one_off', meeting, state)
+
+    assert first is second
+    assert bot.calendar_service.get_authenticated_user_email.call_count == 1
+
+@pytest.mark.parametrize("action", ['cancel_recurring', 'send_emails'])
+async def test_chat_skips_meetings_outside_time_off(bot, action):
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[0], is_recurring=True)
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[1], is_recurring=False)
+    # The time off moved past both meetings after they were fetched
+    _stub_reply(bot, "Going ahead.", current_action=action,
+                time_off_start=datetime(2024, 5, 8), time_off_end=datetime(2024, 5, 10))
+
+    await _chat(bot, "Go ahead")
+
+    bot.calendar_service.acancel_recurring_meetings.assert_not_awaited()
+    bot.calendar_service.asend_rescheduling_email.assert_not_awaited()
+    state = bot.conversation.state_manager.get_state()
+    assert [m.status for m in state['recurring_meetings'] + state['one_off_meetings']] == ['pending', 'pending']
+
+async def test_chat_reuses_time_off_window(bot):
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[0], is_recurring=True)
+    bot.conversation.state_manager.add_calendar_event(MOCK_EVENTS[1], is_recurring=False)
+    bot.calendar_service.acancel_recurring_meetings.return_value = (True, "Successfully cancelled 1 instance")
+    bot.calendar_service.asend_rescheduling_email.return_value = (True, "Email sent successfully")
+
+    with patch.object(bot.conversation.state_manager, '_filter_window',
+                      wraps=bot.conversation.state_manager._filter_window) as filter_window:
+        _stub_reply(bot, "Cancelling them now.", current_action='cancel_recurring')
+        await _chat(bot, "Cancel the recurring ones")
+        _stub_reply(bot, "Sending the emails.", current_action='send_emails')
+        await _chat(bot, "Now email the rest")
+
+    # Cancelling a meeting doesn't change which meetings are in the window
+    filter_window.assert_called_once()
+    state = bot.conversation.state_manager.get_state()
+    assert [m.status for m in state['recurring_meetings'] + state['one_off_meetings']] == ['cancelled', 'notified']
+
+async def test_chat_runs_each_action_once(bot):
+    bot.calendar_service.aget_classified_events.return_value = {'recurring': [], 'one_off': []}
+    _stub_reply(bot, "Looking up your meetings.", current_action='get_meetings')
+    await _chat(bot, "What meetings do I have?")
+
+    _stub_reply(bot, "Anything else?")
+    await _chat(bot, "Thanks")
+
+    bot.calendar_service.aget_classified_events.assert_awaited_once()
+
+async def test_chat_reports_errors(bot):
+    async def stream_response(message):
+        raise RuntimeError("API down")
+        yield
+    bot.conversation.stream_response = stream_response
+
+    outputs = await _chat(bot, "Hi")
+
+    assert outputs == [("An error occurred: API down", [])]
+    assert bot.conversation.state_manager.get_state()['last_error'] == "An error occurred: API down"
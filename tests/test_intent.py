@@ -0,0 +1,92 @@
+"""
+Tests for the local intent parsers.
+"""
+
+import pytest
+from datetime import datetime
+from meeting_rescheduler.intent import match_intent, parse_date_range, parse_event_datetime
+
+# Reference time for the relative phrasings (a Friday morning)
+_NOW = datetime(2024, 3, 1, 9, 0)
+
+def test_match_intent():
+    assert match_intent("Can you connect my calendar?") == 'connect'
+    assert match_intent("Cancel the meeting on Friday") == 'cancel'
+    assert match_intent("I'll be on vacation") == 'time_off'
+    assert match_intent("Hello there") is None
+
+# Shared by the date range tests, so later parses of its dates hit the cache
+_VALID_RANGE = "off 2024-07-01 to 2024-07-15"
+_VALID_DATES = (datetime(2024, 7, 1), datetime(2024, 7, 15))
+
+def test_parse_date_range():
+    assert parse_date_range(_VALID_RANGE, _NOW) == _VALID_DATES
+    assert parse_date_range(_VALID_RANGE.upper(), _NOW) == _VALID_DATES
+    assert parse_date_range("July 1st to July 15th", _NOW) == (datetime(2024, 7, 1), datetime(2024, 7, 15))
+    assert parse_date_range("nothing to see here", _NOW) is None
+
+@pytest.mark.parametrize("text", [
+    "off 2024-02-30 to 2024-03-02",
+    "feb 30 to mar 2",
+])
+def test_parse_date_range_rejects_impossible_dates(text):
+    assert parse_date_range(text, _NOW) is None
+
+@pytest.mark.parametrize("text", [
+    "off 2024-7-1 to 2024-07-15",
+    "off 12024-07-01 to 2024-07-15",
+    "off 2024-07-01 to 2024-07-155",
+])
+def test_parse_date_range_rejects_malformed_dates(text):
+    assert parse_date_range(text, _NOW) is None
+
+@pytest.mark.parametrize("text, expected", [
+    ("sept. 3 to sept 5", (datetime(2024, 9, 3), datetime(2024, 9, 5))),
+    ("december 20 to january 2", (datetime(2024, 12, 20), datetime(2025, 1, 2))),
+])
+def test_parse_date_range_month_names(text, expected):
+    assert parse_date_range(text, _NOW) == expected
+
+@pytest.mark.parametrize("text", [
+    # Words that merely start like a month
+    "maybe 2 to 3 weeks",
+    "we decided 3 to 4 were enough",
+    "marching 1 to 5",
+])
+def test_parse_date_range_ignores_month_lookalikes(text):
+    assert parse_date_range(text, _NOW) is None
+
+@pytest.mark.parametrize("text", [
+    "decided 3 at 2pm",
+    "maybe 2 at 10am",
+])
+def test_parse_event_datetime_ignores_month_lookalikes(text):
+    assert parse_event_datetime(text, _NOW) is None
+
+@pytest.mark.parametrize("text, expected", [
+    ("tomorrow at 2:30pm", datetime(2024, 3, 2, 14, 30)),
+    ("tomorrow at 12am", datetime(2024, 3, 2, 0, 0)),
+    ("tomorrow at 12pm", datetime(2024, 3, 2, 12, 0)),
+    ("on 2024-03-05 at 14:05", datetime(2024, 3, 5, 14, 5)),
+])
+def test_parse_event_datetime(text, expected):
+    start, end = parse_event_datetime(text, _NOW)
+    assert start == expected
+    assert (end - start).total_seconds() == 3600
+
+@pytest.mark.parametrize("text", [
+    # Impossible dates
+    "meet on 2024-02-30 at 2pm",
+    "meet on feb 30 at 2pm",
+    # Hours that don't exist on a 12 hour clock
+    "tomorrow at 45pm",
+    "tomorrow at 13pm",
+    "tomorrow at 0am",
+    # Out of range 24 hour times
+    "tomorrow at 24:00",
+    "tomorrow at 2:75pm",
+    # No time of day
+    "tomorrow",
+])
+def test_parse_event_datetime_rejects_invalid_times(text):
+    assert parse_event_datetime(text, _NOW) is None
@@ -4,10 +4,16 @@ Tests for the LLM integration package.
 
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from datetime import datetime
-from src.llm.conversation import ConversationManager, Message
-from src.llm.state import StateManager, CalendarEvent
-from src.llm.templates import PromptTemplates
+from datetime import datetime, timedelta, timezone
+from meeting_rescheduler.llm.conversation import ConversationManager, Message
+from meeting_rescheduler.llm import state as state_module
+from meeting_rescheduler.llm.state import StateManager, CalendarEvent
+from meeting_rescheduler.llm.templates import PromptTemplates
+from meeting_rescheduler.llm.cache import ResponseCache
+from tests._fixtures import assert_all_in
+
+# Fixed meeting start for event payloads that don't depend on the date
+_FIXED_DT = datetime(2024, 1, 1, 12, 0, 0)
 
 @pytest.fixture
 def mock_openai_response():
@@ -23,13 +29,22 @@ def mock_openai_response():
     
     return MockResponse("I'll help you manage your calendar.")
 
-@pytest.fixture
-def conversation_manager():
-    """Create a ConversationManager with a mock API key."""
+@pytest.fixture(scope="module")
+def _shared_conversation_manager():
+    """Create one ConversationManager with a mock API key for the module."""
     with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
         return ConversationManager()
 
-@pytest.mark.asyncio
+@pytest.fixture
+def conversation_manager(_shared_conversation_manager):
+    """Get the shared ConversationManager, restored to a fresh conversation after each test."""
+    manager = _shared_conversation_manager
+    client = manager.client
+    yield manager
+    manager.client = client
+    manager.clear_history()
+    manager.cache.clear()
+
 async def test_conversation_flow(conversation_manager, mock_openai_response):
     """Test the basic conversation flow."""
     # Mock the OpenAI client
@@ -45,13 +60,48 @@ async def test_conversation_flow(conversation_manager, mock_openai_response):
     assert conversation_manager.messages[1].role == "user"
     assert conversation_manager.messages[2].role == "assistant"
 
+async def test_stream_response(conversation_manager):
+    """Test streaming a response chunk by chunk."""
+    async def mock_stream():
+        for text in ["I'll help", " you."]:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            yield chunk
+    
+    conversation_manager.client = AsyncMock()
+    conversation_manager.client.chat.completions.create.return_value = mock_stream()
+    
+    partials = [partial async for partial in conversation_manager.stream_response("Hi")]
+    
+    # Verify the accumulated text and the final history
+    assert partials == ["I'll help", "I'll help you."]
+    assert conversation_manager.get_history() == [["Hi", "I'll help you."]]
+    assert conversation_manager.messages[2].content == "I'll help you."
+
+async def test_stream_response_stopped_early(conversation_manager):
+    """Test that a stream closed by the caller still records the turn."""
+    async def mock_stream():
+        for text in ["I'll help", " you."]:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            yield chunk
+    
+    conversation_manager.client = AsyncMock()
+    conversation_manager.client.chat.completions.create.return_value = mock_stream()
+    
+    stream = conversation_manager.stream_response("Hi")
+    assert await stream.__anext__() == "I'll help"
+    await stream.aclose()
+    
+    assert conversation_manager.get_history() == [["Hi", "I'll help"]]
+
 def test_state_management():
     """Test the state management functionality."""
     state_manager = StateManager()
     
     # Test initial state
-    assert state_manager.get_state()['authenticated'] == False
-    assert state_manager.get_state()['recurring_meetings'] == []
+    initial = state_manager.get_state()
+    assert (initial['authenticated'], initial['recurring_meetings']) == (False, [])
     
     # Test updating state
     state_manager.update_state(authenticated=True)
@@ -61,28 +111,196 @@ def test_state_management():
     event_data = {
         'id': 'test123',
         'summary': 'Test Meeting',
-        'start_time': datetime.now(),
-        'end_time': datetime.now(),
+        'start_time': _FIXED_DT,
+        'end_time': _FIXED_DT + timedelta(hours=1),
         'attendees': ['test@example.com'],
         'organizer': 'organizer@example.com'
     }
     
     state_manager.add_calendar_event(event_data, is_recurring=True)
-    assert len(state_manager.get_state()['recurring_meetings']) == 1
+    # The state's meeting lists are shared, so one read sees later updates
+    recurring = state_manager.get_state()['recurring_meetings']
+    assert len(recurring) == 1
     
     # Test updating meeting status
     state_manager.update_meeting_status('test123', 'cancelled')
-    assert state_manager.get_state()['recurring_meetings'][0].status == 'cancelled'
+    assert recurring[0].status == 'cancelled'
+
+def test_add_calendar_event_replaces_duplicates():
+    """Test that re-fetching a meeting replaces it instead of adding it twice."""
+    state_manager = StateManager()
+    event_data = {
+        'id': 'test123',
+        'summary': 'Test Meeting',
+        'start_time': _FIXED_DT,
+        'end_time': _FIXED_DT + timedelta(hours=1),
+        'attendees': ['test@example.com'],
+        'organizer': 'organizer@example.com'
+    }
+    
+    state_manager.add_calendar_event(event_data, is_recurring=False)
+    state_manager.update_meeting_status('test123', 'notified')
+    state_manager.add_calendar_event({**event_data, 'summary': 'Renamed'}, is_recurring=False)
+    
+    one_off = state_manager.get_state()['one_off_meetings']
+    assert [(m.summary, m.status) for m in one_off] == [('Renamed', 'notified')]
+    
+    # The status update reaches the only stored copy, so it isn't emailed twice
+    state_manager.add_calendar_event(event_data, is_recurring=False)
+    state_manager.update_meeting_status('test123', 'cancelled')
+    assert [m.status for m in state_manager.get_state()['one_off_meetings']] == ['cancelled']
+    
+    # A meeting reclassified as recurring moves to the other list
+    state_manager.add_calendar_event(event_data, is_recurring=True)
+    state = state_manager.get_state()
+    assert (len(state['recurring_meetings']), state['one_off_meetings']) == (1, [])
+
+def test_calendar_event_from_api():
+    """Test building a CalendarEvent from a Calendar API event resource."""
+    event = CalendarEvent.from_api({
+        'id': 'api123',
+        'summary': 'Planning',
+        'start': {'dateTime': '2024-03-20T10:00:00Z'},
+        'end': {'dateTime': '2024-03-20T11:00:00Z'},
+        'attendees': [{'email': 'test@example.com'}],
+        'organizer': {'email': 'organizer@example.com'}
+    }, is_recurring=False)
+    
+    assert event.event_id == 'api123'
+    assert event.start_time == datetime(2024, 3, 20, 10, tzinfo=timezone.utc)
+    assert event.attendees == ['test@example.com']
+    assert event.organizer == 'organizer@example.com'
+    assert event.status == 'pending'
+    
+    # All-day and offset times are normalised to aware UTC like the timed ones
+    all_day = CalendarEvent.from_api({
+        'id': 'allday',
+        'start': {'date': '2024-03-21'},
+        'end': {'dateTime': '2024-03-22T02:00:00+02:00'}
+    }, is_recurring=False)
+    assert all_day.start_time == datetime(2024, 3, 21, tzinfo=timezone.utc)
+    assert all_day.end_time == datetime(2024, 3, 22, tzinfo=timezone.utc)
+    assert all_day.end_time.tzinfo == timezone.utc
+
+def test_events_in_window():
+    """Test finding the meetings that overlap a time window."""
+    state_manager = StateManager()
+    for event_id, day in (('early', 1), ('inside', 5), ('late', 20)):
+        state_manager.add_calendar_event({
+            'id': event_id,
+            'summary': event_id,
+            'start_time': datetime(2024, 7, day, 10),
+            'end_time': datetime(2024, 7, day, 11),
+            'attendees': [],
+            'organizer': 'organizer@example.com'
+        }, is_recurring=event_id == 'inside')
+    
+    window = state_manager.events_in_window(datetime(2024, 7, 2), datetime(2024, 7, 15))
+    assert [event.event_id for event in window] == ['inside']
+    
+    # Narrower windows and repeated queries reuse the cached result
+    narrower = state_manager.events_in_window(datetime(2024, 7, 5, 10, 30), datetime(2024, 7, 10))
+    assert [event.event_id for event in narrower] == ['inside']
+    assert state_manager.events_in_window(datetime(2024, 7, 6), datetime(2024, 7, 10)) == []
+    
+    # Status changes keep cached results, which hold the updated meeting
+    state_manager.update_meeting_status('inside', 'cancelled')
+    window = state_manager.events_in_window(datetime(2024, 7, 2), datetime(2024, 7, 15))
+    assert [(event.event_id, event.status) for event in window] == [('inside', 'cancelled')]
+    
+    # Adding a meeting invalidates cached results
+    state_manager.add_calendar_event({
+        'id': 'added',
+        'summary': 'added',
+        'start_time': datetime(2024, 7, 8, 9),
+        'end_time': datetime(2024, 7, 8, 10),
+        'attendees': [],
+        'organizer': 'organizer@example.com'
+    }, is_recurring=False)
+    window = state_manager.events_in_window(datetime(2024, 7, 2), datetime(2024, 7, 15))
+    assert [event.event_id for event in window] == ['inside', 'added']
+    
+    state_manager.reset()
+    assert state_manager.events_in_window(datetime(2024, 7, 2), datetime(2024, 7, 15)) == []
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_events_in_window_mixes_all_day_and_timed(monkeypatch, use_numpy):
+    """Test windows over all-day and timed meetings, with and without numpy."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(state_module, "np", None)
+    state_manager = StateManager()
+    state_manager.add_calendar_event({
+        'id': 'all_day',
+        'summary': 'Offsite',
+        'start': {'date': '2024-07-05'},
+        'end': {'date': '2024-07-06'}
+    }, is_recurring=False)
+    state_manager.add_calendar_event({
+        'id': 'timed',
+        'summary': 'Standup',
+        'start': {'dateTime': '2024-07-08T10:00:00+02:00'},
+        'end': {'dateTime': '2024-07-08T10:15:00+02:00'}
+    }, is_recurring=True)
+    
+    # Aware and naive (UTC) bounds give the same result
+    window = state_manager.events_in_window(
+        datetime(2024, 7, 1, tzinfo=timezone.utc), datetime(2024, 7, 15, tzinfo=timezone.utc)
+    )
+    assert [event.event_id for event in window] == ['all_day', 'timed']
+    assert state_manager.events_in_window(datetime(2024, 7, 1), datetime(2024, 7, 15)) == window
+    
+    # Narrowing the cached window compares the same normalised times
+    narrower = state_manager.events_in_window(datetime(2024, 7, 8, 8, 5), datetime(2024, 7, 9))
+    assert [event.event_id for event in narrower] == ['timed']
+    assert state_manager.events_in_window(datetime(2024, 7, 8, 8, 15), datetime(2024, 7, 9)) == []
+
+def test_apply_tool_call():
+    """Test updating state from a calendar_action tool call."""
+    state_manager = StateManager()
+    
+    state = state_manager.apply_tool_call(
+        'calendar_action',
+        '{"action": "get_meetings", "time_off_start": "2024-03-20", "time_off_end": "2024-03-25"}'
+    )
+    assert state['current_action'] == 'get_meetings'
+    assert state['time_off_start'] == datetime(2024, 3, 20)
+    assert state['time_off_end'] == datetime(2024, 3, 25)
+    
+    # Unknown tools and malformed arguments leave the state unchanged
+    assert state_manager.apply_tool_call('other_tool', '{"action": "send_emails"}')['current_action'] == 'get_meetings'
+    assert state_manager.apply_tool_call('calendar_action', 'not json')['current_action'] == 'get_meetings'
+
+def test_update_from_response():
+    """Test updating the state from a plain-text LLM response."""
+    state_manager = StateManager()
+    
+    state = state_manager.update_from_response("I'll help you manage your calendar.")
+    assert state['current_action'] is None
+    
+    # Dates are picked up from the text, but actions only come from tool calls
+    state = state_manager.update_from_response(
+        "So you're off 2024-07-01 to 2024-07-15. Looking up your meetings for that period..."
+    )
+    assert state['time_off_start'] == datetime(2024, 7, 1)
+    assert state['time_off_end'] == datetime(2024, 7, 15)
+    assert state['current_action'] is None
+
+@pytest.mark.parametrize("response", [
+    "Would you like me to go ahead with cancelling your recurring meetings?",
+    "I won't be sending the rescheduling emails until you confirm.",
+    "Cancelling your recurring meetings...",
+])
+def test_update_from_response_never_starts_actions(response):
+    """Test that questions, negations and progress text don't start calendar actions."""
+    state_manager = StateManager()
+    assert state_manager.update_from_response(response)['current_action'] is None
 
 def test_prompt_templates():
     """Test the prompt templates functionality."""
     templates = PromptTemplates()
     
-    # Test system prompt
-    system_prompt = templates.get_system_prompt()
-    assert "You are a helpful meeting rescheduler assistant" in system_prompt
-    
-    # Test state prompt
     state = {
         'authenticated': True,
         'time_off_start': '2024-03-20',
@@ -90,20 +308,32 @@ def test_prompt_templates():
         'recurring_meetings': [1, 2],  # Just testing length
         'one_off_meetings': [1]  # Just testing length
     }
+    one_off_template = templates.get_email_template('one_off')
     
-    state_prompt = templates.get_state_prompt(state)
-    assert "✓ User is authenticated" in state_prompt
-    assert "Found 2 recurring meetings" in state_prompt
-    assert "Found 1 one-off meetings" in state_prompt
-    
-    # Test email templates
-    recurring_template = templates.get_email_template('recurring')
-    assert "Cancellation Notice" in recurring_template
-    assert "{meeting_name}" in recurring_template
+    # Each template is rendered once and checked for all of its expected text
+    checks = [
+        (templates.get_system_prompt(), ["You are a helpful meeting rescheduler assistant"]),
+        (templates.get_state_prompt(state), [
+            "✓ User is authenticated",
+            "Found 2 recurring meetings",
+            "Found 1 one-off meetings"
+        ]),
+        (templates.get_email_template('recurring'), ["Cancellation Notice", "{meeting_name}"]),
+        (one_off_template, ["Unable to Attend", "Would it be possible to reschedule"]),
+    ]
+    for text, expected in checks:
+        assert_all_in(text, *expected)
     
-    one_off_template = templates.get_email_template('one_off')
-    assert "Unable to Attend" in one_off_template
-    assert "Would it be possible to reschedule" in one_off_template
+    values = {
+        'meeting_name': 'Team Sync',
+        'attendee_name': 'all',
+        'meeting_date': 'July 3, 2024',
+        'time_off_start': 'July 1, 2024',
+        'time_off_end': 'July 15, 2024',
+        'user_name': 'me@example.com'
+    }
+    assert templates.render_email_template('one_off', **values) == one_off_template.format(**values)
+    assert templates.render_email_template('unknown', **values) == ""
 
 def test_message_class():
     """Test the Message class functionality."""
@@ -132,4 +362,73 @@ def test_conversation_history(conversation_manager):
     # Test clearing history
     conversation_manager.clear_history()
     assert len(conversation_manager.get_history()) == 0
-    assert len(conversation_manager.messages) == 1  # Only system message remains 
\ No newline at end of file
+    assert len(conversation_manager.messages) == 1  # Only system message remains 
+
+def test_response_cache():
+    """Test exact lookups in the response cache."""
+    cache = ResponseCache()
+    key = ResponseCache.digest("system", "state", "What's next?")
+    cache.put(key, "state", "Cached reply", embedding=[1.0, 0.0, 0.0])
+    
+    # Exact matches hit regardless of embeddings
+    assert cache.get_exact(key) == "Cached reply"
+    assert cache.get_exact(ResponseCache.digest("system", "state", "Something else")) is None
+
+def test_response_cache_similarity():
+    """Test that near-duplicate messages hit only in the same state."""
+    pytest.importorskip("numpy")
+    cache = ResponseCache()
+    key = ResponseCache.digest("system", "state", "What's next?")
+    cache.put(key, "state", "Cached reply", embedding=[1.0, 0.0, 0.0])
+    
+    assert cache.get_similar([0.99, 0.05, 0.0], "state") == "Cached reply"
+    assert cache.get_similar([0.99, 0.05, 0.0], "other state") is None
+    assert cache.get_similar([0.0, 1.0, 0.0], "state") is None
+
+async def test_conversation_cache_hit(conversation_manager, mock_openai_response):
+    """Test that a repeated message is answered from the cache."""
+    conversation_manager.client = AsyncMock()
+    conversation_manager.client.chat.completions.create.return_value = mock_openai_response
+    
+    await conversation_manager.get_response("Hi, I need to manage my calendar.")
+    conversation_manager.clear_history()
+    response, _ = await conversation_manager.get_response("Hi, I need to manage my calendar.")
+    
+    assert response == "I'll help you manage your calendar."
+    assert conversation_manager.client.chat.completions.create.call_count == 1
+    # Semantic caching is off by default, so no embeddings are requested
+    conversation_manager.client.embeddings.create.assert_not_called()
+
+async def test_conversation_cache_keyed_by_previous_reply(conversation_manager):
+    """Test that a short reply isn't answered from the cache after a different question."""
+    conversation_manager.client = AsyncMock()
+    conversation_manager.client.chat.completions.create.side_effect = [
+        MagicMock(choices=[MagicMock(message=MagicMock(content=text, tool_calls=None))])
+        for text in ["Shall I list your meetings?", "Listing them now.",
+                     "Shall I send the emails?", "Sending them now."]
+    ]
+    
+    await conversation_manager.get_response("Hi")
+    await conversation_manager.get_response("yes")
+    conversation_manager.clear_history()
+    await conversation_manager.get_response("Hello")
+    response, _ = await conversation_manager.get_response("yes")
+    
+    assert response == "Sending them now."
+    assert conversation_manager.client.chat.completions.create.call_count == 4
+
+async def test_conversation_semantic_cache_hit(mock_openai_response):
+    """Test that a near-duplicate message is answered from the cache when enabled."""
+    pytest.importorskip("numpy")
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+        manager = ConversationManager(semantic_cache=True)
+    manager.client = AsyncMock()
+    manager.client.chat.completions.create.return_value = mock_openai_response
+    manager.client.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[1.0, 0.0, 0.0])])
+    
+    await manager.get_response("Hi, I need to manage my calendar.")
+    manager.clear_history()
+    response, _ = await manager.get_response("Hi, I need to manage my calendar!")
+    
+    assert response == "I'll help you manage your calendar."
+    assert manager.client.embeddings.create.call_count == 2